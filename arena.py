@@ -0,0 +1,232 @@
+from array import array
+
+# kinds of slots, stored in the two lowest bits of a slot
+NODE, SEQUENCE, VALUE = range(3)
+
+
+class NodeArena:
+    """
+    syntax tree stored in flat arrays instead of one namedtuple per node
+
+        kinds   index of the node class of every node in nodeClasses
+        firsts  where the fields of every node start in slots
+        slots   one encoded slot per field of every node
+        items   sequences, their length followed by a slot per item
+        values  every distinct leaf value, once
+
+    a slot holds (payload << 2 | kind), where payload is a node index
+    for NODE, an offset into items for SEQUENCE and an index into values
+    for VALUE, sequence lengths are stored doubled with the lowest bit
+    set for tuples, slots are 32 bits so an arena holds up to 2**30
+    nodes, sequence items and values
+
+    indexing the arena gives views named after the node class, which
+    read their fields from the arrays on access, so Generator can walk
+    an arena like a tree of namedtuples
+
+    example:
+        arena = NodeArena.fromTree(MyParser(tokens).parse())
+        Generator(arena).generate()
+        arena.toTree() == tree
+    """
+
+    def __init__(self):
+        self.kinds = array('H')
+        self.firsts = array('I')
+        self.slots = array('I')
+        self.items = array('I')
+        self.roots = array('I')
+
+        self.nodeClasses = []
+        self._kindIds = {}
+        self.values = []
+        self._valueIds = {}
+
+    @classmethod
+    def fromTree(cls, tree):
+        """
+        build an arena from a list of namedtuple nodes, lists, tuples
+        and leaf values, without recursion so deep trees fit
+        """
+        arena = cls()
+        arena.roots.extend([0] * len(tree))
+
+        # (value, array, position) of every slot still to be written,
+        # nodes are numbered in the order they appear
+        stack = [(value, arena.roots, position) for position, value in reversed(list(enumerate(tree)))]
+
+        while stack:
+            value, target, position = stack.pop()
+
+            if isinstance(value, tuple) and hasattr(value, "_fields"):
+                index = arena._addNode(value.__class__)
+                first = arena.firsts[index]
+                target[position] = index << 2 | NODE
+                stack.extend((field, arena.slots, first + i) for i, field in reversed(list(enumerate(value))))
+
+            elif isinstance(value, (list, tuple)):
+                start = len(arena.items)
+                arena.items.append(len(value) << 1 | isinstance(value, tuple))
+                arena.items.extend([0] * len(value))
+                target[position] = start << 2 | SEQUENCE
+                stack.extend((item, arena.items, start + 1 + i) for i, item in reversed(list(enumerate(value))))
+
+            else:
+                target[position] = arena._addValue(value) << 2 | VALUE
+
+        return arena
+
+    def toTree(self):
+        """
+        the namedtuple tree the arena was built from
+        """
+        return [self._build(slot) for slot in self.roots]
+
+    def _addNode(self, nodeClass):
+        kind = self._kindIds.get(nodeClass)
+        if kind is None:
+            kind = self._kindIds[nodeClass] = len(self.nodeClasses)
+            self.nodeClasses.append(nodeClass)
+
+        self.kinds.append(kind)
+        self.firsts.append(len(self.slots))
+        self.slots.extend([0] * len(nodeClass._fields))
+        return len(self.kinds) - 1
+
+    def _addValue(self, value):
+        try:
+            key = (type(value), value)
+            index = self._valueIds.get(key)
+        except TypeError:
+            key = index = None
+
+        if index is None:
+            index = len(self.values)
+            self.values.append(value)
+            if key is not None:
+                self._valueIds[key] = index
+        return index
+
+    def _decode(self, slot):
+        """
+        the view, list of views or value a slot holds
+        """
+        kind, payload = slot & 3, slot >> 2
+
+        if kind == NODE:
+            return self[payload]
+
+        if kind == SEQUENCE:
+            header = self.items[payload]
+            sequence = [self._decode(item) for item in self.items[payload + 1:payload + 1 + (header >> 1)]]
+            return tuple(sequence) if header & 1 else sequence
+
+        return self.values[payload]
+
+    def _fieldsOf(self, slot):
+        payload = slot >> 2
+        if slot & 3 == NODE:
+            first = self.firsts[payload]
+            return self.slots[first:first + len(self.nodeClasses[self.kinds[payload]]._fields)]
+        return self.items[payload + 1:payload + 1 + (self.items[payload] >> 1)]
+
+    def _build(self, slot):
+        """
+        the namedtuple value of a slot, children are built first
+        with an explicit stack
+        """
+        if slot & 3 == VALUE:
+            return self.values[slot >> 2]
+
+        # (slot, slots of its fields or items, values built so far)
+        stack = [(slot, self._fieldsOf(slot), [])]
+
+        while True:
+            slot, fields, children = stack[-1]
+
+            if len(children) < len(fields):
+                child = fields[len(children)]
+                if child & 3 == VALUE:
+                    children.append(self.values[child >> 2])
+                else:
+                    stack.append((child, self._fieldsOf(child), []))
+                continue
+
+            stack.pop()
+            payload = slot >> 2
+            if slot & 3 == NODE:
+                built = self.nodeClasses[self.kinds[payload]](*children)
+            else:
+                built = tuple(children) if self.items[payload] & 1 else children
+
+            if not stack:
+                return built
+            stack[-1][2].append(built)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        return _viewClass(self.nodeClasses[self.kinds[index]])(self, index)
+
+    def __iter__(self):
+        """
+        the roots, as the list the arena was built from
+        """
+        for slot in self.roots:
+            yield self._decode(slot)
+
+
+class NodeView:
+    """
+    a node in a NodeArena, reads like the namedtuple it was built from
+    """
+    __slots__ = ("arena", "index")
+    _fields = ()
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    def _field(self, i):
+        arena = self.arena
+        return arena._decode(arena.slots[arena.firsts[self.index] + i])
+
+    def _asdict(self):
+        return {field: self._field(i) for i, field in enumerate(self._fields)}
+
+    def __iter__(self):
+        for i in range(len(self._fields)):
+            yield self._field(i)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __eq__(self, other):
+        if isinstance(other, NodeView):
+            return type(self) is type(other) and tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={value!r}" for field, value in self._asdict().items())
+        return f"{self.__class__.__name__}({fields})"
+
+    def toNode(self):
+        return self.arena._build(self.index << 2 | NODE)
+
+
+_viewClasses = {}
+
+
+def _viewClass(nodeClass):
+    """
+    the NodeView subclass named after nodeClass, with a property per field
+    """
+    view = _viewClasses.get(nodeClass)
+    if view is None:
+        namespace = {"__slots__": (), "_fields": nodeClass._fields, "_nodeClass": nodeClass}
+        for i, field in enumerate(nodeClass._fields):
+            namespace[field] = property(lambda self, i=i: self._field(i))
+
+        view = _viewClasses[nodeClass] = type(nodeClass.__name__, (NodeView,), namespace)
+    return view
@@ -0,0 +1,206 @@
+import argparse
+import ast
+import importlib.util
+import marshal
+import os
+
+from tokenizer import Tokenizer
+from tokenParser import MyParser
+from generator import Generator, walk_operations
+
+# python operator node of every operator the parser builds operations of
+_OPERATORS = {
+    "+": ast.Add,
+    "-": ast.Sub,
+    "*": ast.Mult,
+}
+
+# there is no text for line numbers to point into, every node is put
+# on line 1 when it is made, fix_missing_locations would walk the tree again
+_LOCATION = {"lineno": 1, "col_offset": 0}
+
+# contexts hold no state, one of each is shared
+_LOAD, _STORE = ast.Load(), ast.Store()
+
+
+def _node(cls, **fields):
+    """
+    an ast node with only the fields this python version has,
+    positional only arguments and type ignores came in 3.8
+    """
+    return cls(**{name: value for name, value in fields.items() if name in cls._fields or name in cls._attributes})
+
+
+class AstGenerator(Generator):
+    """
+    lowers the tree into python ast nodes instead of text, so the
+    result is compiled by compile() without writing and reparsing code
+
+    it overrides the handlers of Generator node by node, and the code
+    does what the text of Generator does, statics are upper case and
+    calls may only pass defined variables
+
+    example:
+        code = AstGenerator(tree).compile("program.swft")
+        exec(code, {"print": print})
+    """
+
+    # there is no text to stream
+    _streamers = {}
+
+    _ = Generator._
+
+    def generate(self):
+        """
+        the tree as an ast.Module
+        """
+        body = []
+        for expr in self._topLevel():
+            func = self._get_method(expr.__class__.__name__)
+            body.append(_statement(func(self, expr)))
+
+        return _node(ast.Module, body=body, type_ignores=[])
+
+    def generate_to(self, stream):
+        raise TypeError("AstGenerator builds code objects, use Generator to write text")
+
+    def compile(self, filename="<swft>"):
+        return compile(self.generate(), filename, "exec")
+
+    @_("FunctionNode", opensScope=True)
+    def lower_function_definition(self, name, parameters, body):
+        arguments = _node(ast.arguments, posonlyargs=[], args=[argument for argument, default in parameters], vararg=None,
+                          kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[default for argument, default in parameters])
+
+        # a function needs at least one statement
+        body = [_statement(statement) for statement in body] or [ast.Pass(**_LOCATION)]
+        return _node(ast.FunctionDef, name=name.id, args=arguments, body=body, decorator_list=[], returns=None, type_params=[],
+                     **_LOCATION)
+
+    @_("ParameterNode")
+    def lower_parameter(self, hint, name, param_type, default):
+        self.symbols.define(name.id, "dynamic")
+
+        annotation = param_type if param_type != 'Any' else None
+        if default is None:
+            default = ast.Constant(None, **_LOCATION)
+        return ast.arg(arg=name.id, annotation=annotation, **_LOCATION), default
+
+    @_("StaticAssignmentNode")
+    def lower_statassign(self, name, param_type, value):
+        self.symbols.define(name.id, "let")
+        self.symbols.define(name.id.upper(), "static")
+
+        return _assignment(name.id.upper(), param_type, value)
+
+    @_("DynamicAssignmentNode")
+    def lower_dynassign(self, name, param_type, value):
+        self.symbols.define(name.id, "dynamic")
+
+        return _assignment(name.id, param_type, value)
+
+    @_("CallNode")
+    def lower_call(self, name, parameters):
+        for parameter in parameters:
+            if type(parameter) is ast.Name:
+                assert parameter.id in self.symbols, f"variable {parameter.id} is not defined"
+
+        return ast.Call(func=name, args=parameters, keywords=[], **_LOCATION)
+
+    @_("BinaryOperationNode", childNodes=True)
+    def lower_binary_operation(self, expr1, operator, expr2):
+        def operation(left, operator, right):
+            assert operator in _OPERATORS, f"no python operator for {operator}"
+            return ast.BinOp(left=left, op=_OPERATORS[operator](), right=right, **_LOCATION)
+
+        return walk_operations(expr1, operator, expr2, lambda node: self._tryGenerating(node, 0), operation)
+
+    @_("IdentifierNode")
+    def lower_identifier(self, value):
+        return ast.Name(id=value.upper() if self.symbols.lookup(value) == "let" else value, ctx=_LOAD, **_LOCATION)
+
+    @_("LiteralNode")
+    def lower_literal(self, value):
+        # string literals are kept with their quotes
+        return ast.Constant(ast.literal_eval(value) if type(value) is str else value, **_LOCATION)
+
+
+def _assignment(name, param_type, value):
+    target = ast.Name(id=name, ctx=_STORE, **_LOCATION)
+    if param_type == 'Any':
+        return ast.Assign(targets=[target], value=value, **_LOCATION)
+    return ast.AnnAssign(target=target, annotation=param_type, value=value, simple=1, **_LOCATION)
+
+
+def _statement(node):
+    return ast.Expr(value=node, **_LOCATION) if isinstance(node, ast.expr) else node
+
+
+def compile_tree(tree, filename="<swft>"):
+    """
+    the code object of a tree from the parser
+    """
+    return AstGenerator(tree).compile(filename)
+
+
+def dump_code(code, source=b""):
+    """
+    code as the bytes of a .pyc file checked against the hash of source,
+    which import and load_code read back
+    """
+    if isinstance(source, str):
+        source = source.encode()
+
+    # magic, flags of a checked hash based pyc, hash of the source, then the code
+    flags = (0b11).to_bytes(4, "little")
+    return importlib.util.MAGIC_NUMBER + flags + importlib.util.source_hash(source) + marshal.dumps(code)
+
+
+def load_code(data, source=None):
+    """
+    the code object in the bytes of a .pyc file, None when
+    it was written by another python version, or with source,
+    when it is not checked against the hash of source
+    """
+    if data[:4] != importlib.util.MAGIC_NUMBER:
+        return None
+
+    if source is not None:
+        if isinstance(source, str):
+            source = source.encode()
+        if int.from_bytes(data[4:8], "little") != 0b11 or data[8:16] != importlib.util.source_hash(source):
+            return None
+    return marshal.loads(data[16:])
+
+
+def write_code(code, path, source=b""):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(dump_code(code, source))
+    os.replace(temporary, path)
+
+
+def read_code(path, source=None):
+    with open(path, "rb") as file:
+        return load_code(file.read(), source)
+
+
+def main(argv=None):
+    """
+    python astgenerator.py program.swft [-o program.pyc]
+    """
+    arguments = argparse.ArgumentParser(description="compile a .swft file to a .pyc file")
+    arguments.add_argument("path")
+    arguments.add_argument("-o", "--output", default=None, help="the .pyc file, next to the source by default")
+    arguments = arguments.parse_args(argv)
+
+    with open(arguments.path, "rb") as file:
+        source = file.read()
+
+    tree = MyParser(Tokenizer(source.decode()).tokenize_store()).parse()
+    output = arguments.output or os.path.splitext(arguments.path)[0] + ".pyc"
+    write_code(compile_tree(tree, arguments.path), output, source)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import io
+import os
+import re
+import sys
+
+from tokenizer import Tokenizer, TokenStore, _whitespace
+from tokenParser import MyParser
+from generator import Generator
+from pipeline import compile_to
+from cache import ArtifactCache
+
+# code is None when the file failed, error is None when it compiled,
+# cached tells if the code came from the artifact cache, cacheStats
+# is what looking it up and storing it added to (hits, misses, evictions)
+CompileResult = namedtuple("CompileResult", ("path", "code", "error", "cached", "cacheStats"), defaults=(False, (0, 0, 0)))
+
+_parserClass = MyParser
+_generatorClass = Generator
+_cache = None
+
+
+def compile_many(paths, workers=None, parserClass=MyParser, generatorClass=Generator, cache=None, cacheSize=256 << 20):
+    """
+    compile every .swft file in paths on a pool of worker processes,
+    returns a CompileResult per path, in the order of paths
+
+    a file which fails to tokenize, parse or generate gets its error
+    as text in its result, the other files are still compiled
+
+    every worker builds the grammar once when it starts and compiles
+    files in chunks, workers=1 compiles in this process without a pool,
+    workers defaults to the number of cpus
+
+    with cache, a directory, every worker looks files up in an
+    ArtifactCache there of at most cacheSize bytes and stores what
+    it compiles, unchanged files are not compiled again, cache can
+    be an ArtifactCache too, its directory and maxSize are used and
+    the hits, misses and evictions of every worker are added to it
+
+    example:
+        cache = ArtifactCache(".swftcache")
+        for result in compile_many(["a.swft", "b.swft"], workers=4, cache=cache):
+            print(result.error or result.code)
+        print(cache.stats())
+    """
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+
+    counted = None
+    if isinstance(cache, ArtifactCache):
+        counted, cache, cacheSize = cache, cache.directory, cache.maxSize
+
+    # the grammar is built before forking so workers can inherit it
+    _initWorker(parserClass, generatorClass, cache, cacheSize)
+
+    if workers == 1 or len(paths) <= 1:
+        results = [_compileFile(path) for path in paths]
+    else:
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(workers, initializer=_initWorker, initargs=(parserClass, generatorClass, cache, cacheSize)) as executor:
+            results = list(executor.map(_compileFile, paths, chunksize=chunksize))
+
+    if counted is not None:
+        for result in results:
+            hits, misses, evictions = result.cacheStats
+            counted.hits += hits
+            counted.misses += misses
+            counted.evictions += evictions
+    return results
+
+
+def parse_parallel(source, workers=None, parserClass=MyParser, chunks=None):
+    """
+    parse the text of one program on a pool of worker processes,
+    returns the same tree as parserClass(Tokenizer(source).tokenize()).parse()
+
+    the source is split after the '}' closing top level blocks into
+    about chunks pieces, default 4 per worker, every worker tokenizes
+    and parses its pieces and the trees are joined in source order
+
+    a piece is parsed together with the first token after it and only
+    kept when its units end exactly at its end without any alternative
+    failing past that token, otherwise, or on a parse error, the whole
+    source is parsed again in this process so errors are the same too
+    """
+    workers = workers or os.cpu_count() or 1
+    _initWorker(parserClass, Generator)
+
+    pieces = _splitSource(source, chunks or workers * 4)
+    if workers == 1 or len(pieces) <= 1:
+        return parserClass(Tokenizer(source).tokenize_store()).parse()
+
+    with ProcessPoolExecutor(workers, initializer=_initWorker, initargs=(parserClass, Generator)) as executor:
+        parsed = list(executor.map(_parsePiece, pieces))
+
+    if None in parsed:
+        return parserClass(Tokenizer(source).tokenize_store()).parse()
+    return [unit for units in parsed for unit in units]
+
+
+def _splitSource(source, count):
+    """
+    (text, lookahead) pieces of source cut after top level blocks,
+    lookahead is the text of the next piece, '{' and '}' are only
+    ever tokenized as char tokens so the characters are enough
+    """
+    cuts, depth = [], 0
+    for match in re.finditer(r"[{}]", source):
+        if match.group() == "{":
+            depth += 1
+        elif depth > 0:
+            depth -= 1
+            if depth == 0:
+                # pieces start on a token, a leading space would be a token
+                cuts.append(_whitespace.match(source, match.end()).end())
+
+    # keep about count pieces of similar length
+    size = len(source) / count
+    starts = [0]
+    for cut in cuts:
+        if cut < len(source) and cut - starts[-1] >= size:
+            starts.append(cut)
+    ends = starts[1:] + [len(source)]
+
+    # no token spans whitespace, the first word holds the next token
+    texts = [source[start:end] for start, end in zip(starts, ends)]
+    lookaheads = [re.match(r"\S*", text).group() for text in texts[1:]] + [""]
+    return list(zip(texts, lookaheads))
+
+
+def _parsePiece(piece):
+    """
+    the units of a piece, None when they may depend on what follows it
+    """
+    text, lookahead = piece
+    units = []
+    try:
+        tokens = Tokenizer(text).tokenize()
+        length = len(tokens)
+
+        if lookahead:
+            tokens.append(Tokenizer(lookahead).tokenize_one_token())
+
+        parser = _parserClass(TokenStore.fromTokens(tokens))
+        while parser.executeIndex < length:
+            units.append(parser.parse_start_of_file(debug=False))
+    except Exception:
+        # parsed again in one piece, which raises the error where it belongs
+        return None
+
+    if parser.executeIndex != length or parser._farthest > length:
+        return None
+    return units
+
+
+def _initWorker(parserClass, generatorClass, cache=None, cacheSize=None):
+    global _parserClass, _generatorClass, _cache
+    _parserClass, _generatorClass = parserClass, generatorClass
+    _cache = ArtifactCache(cache, cacheSize, parserClass, generatorClass) if cache is not None else None
+    parserClass._codedRules()
+
+
+def _compileFile(path):
+    if _cache is None:
+        try:
+            stream = io.StringIO()
+            compile_to(path, stream, _parserClass, _generatorClass)
+        except Exception as e:
+            return CompileResult(path, None, f"{type(e).__name__}: {e}")
+        return CompileResult(path, stream.getvalue(), None)
+
+    # the counts go back with the result, every worker has its own cache
+    before = (_cache.hits, _cache.misses, _cache.evictions)
+    code = error = None
+    try:
+        code = _cache.compile_file(path)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    stats = tuple(after - count for after, count in zip((_cache.hits, _cache.misses, _cache.evictions), before))
+    return CompileResult(path, code, error, stats[0] > 0, stats)
+
+
+def _targets(paths, directory=None):
+    """
+    the .py file every path is written to, next to it, or in directory
+    at its path from the deepest directory holding every path, so files
+    of the same name in different directories are kept apart
+    """
+    targets = [os.path.splitext(path)[0] + ".py" for path in paths]
+    if directory is None or not targets:
+        return targets
+
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    return [os.path.join(directory, os.path.relpath(os.path.abspath(target), root)) for target in targets]
+
+
+def main(argv=None):
+    """
+    python batch.py [-j workers] [-o directory] [--cache directory] files...
+
+    writes the code of every file next to it, or into directory,
+    with a .py extension, errors are printed and make the exit status 1
+
+    files from different directories keep their directories below
+    directory, from the deepest one they share
+    """
+    arguments = argparse.ArgumentParser(description="compile .swft files to python")
+    arguments.add_argument("paths", nargs="+", metavar="file")
+    arguments.add_argument("-j", "--workers", type=int, default=None, help="worker processes, default the number of cpus")
+    arguments.add_argument("-o", "--output", default=None, help="directory for the compiled files")
+    arguments.add_argument("--cache", default=None, help="directory of the artifact cache")
+    arguments.add_argument("--cache-size", type=int, default=256, help="size limit of the artifact cache in megabytes")
+    arguments = arguments.parse_args(argv)
+
+    targets = _targets(arguments.paths, arguments.output)
+    cache = ArtifactCache(arguments.cache, arguments.cache_size << 20) if arguments.cache is not None else None
+
+    failed = 0
+    results = compile_many(arguments.paths, arguments.workers, cache=cache)
+    for result, target in zip(results, targets):
+        if result.error is not None:
+            failed += 1
+            print(f"{result.path}: {result.error}", file=sys.stderr)
+            continue
+
+        if arguments.output is not None:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w") as file:
+            file.write(result.code)
+
+    print(f"compiled {len(arguments.paths) - failed} of {len(arguments.paths)} files", file=sys.stderr)
+    if cache is not None:
+        # files that failed are in the count above, not among the misses
+        hits = sum(result.cached for result in results)
+        misses = len(results) - failed - hits
+        print(f"artifact cache: {hits} hits, {misses} misses, {cache.evictions} evictions", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""
+seeded .swft programs and a runner measuring the tokenizer, parser
+and generator on them, run from the root of the repository:
+
+    python -m benchmarks.run -o results.json
+"""
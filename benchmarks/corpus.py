@@ -0,0 +1,109 @@
+import random
+
+# how a program grows with its size, every shape scales one dimension
+SHAPES = {
+    "functions": dict(functions=1, parameters=2, statements=3, depth=2, assignments=0.35),
+    "parameters": dict(functions=4, parameters=1, statements=2, depth=1, assignments=0.35),
+    "expressions": dict(functions=1, parameters=2, statements=1, depth=1, assignments=1.0),
+    "statements": dict(functions=1, parameters=2, statements=1, depth=2, assignments=0.35),
+}
+
+# the dimension of each shape multiplied by the size
+_SCALED = {
+    "functions": "functions",
+    "parameters": "parameters",
+    "expressions": "depth",
+    "statements": "statements",
+}
+
+
+def generate_program(shape="functions", size=100, seed=0):
+    """
+    a .swft program of the given shape, the same for the same
+    shape, size and seed
+
+    shapes:
+        functions     size functions with a few statements each
+        parameters    functions with size parameters each
+        expressions   an expression nested size parentheses deep
+        statements    one function with size statements
+
+    every program tokenizes, parses and generates, variables
+    are defined before they are passed to a call
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"unknown shape {shape}, expected one of {', '.join(SHAPES)}")
+
+    dimensions = dict(SHAPES[shape])
+    dimensions[_SCALED[shape]] *= size
+    return _ProgramWriter(random.Random(seed), **dimensions).program()
+
+
+class _ProgramWriter:
+    def __init__(self, rng, functions, parameters, statements, depth, assignments):
+        self.rng = rng
+        self.assignments = assignments
+        self.functions = functions
+        self.parameters = parameters
+        self.statements = statements
+        self.depth = depth
+        self.names = 0
+
+    def program(self):
+        return "\n\n".join(self.function([], 0, self.statements) for _ in range(self.functions)) + "\n"
+
+    def name(self, prefix):
+        self.names += 1
+        return f"{prefix}{self.names}"
+
+    def function(self, defined, level, statements):
+        parameters = [self.name("p") for _ in range(self.parameters)]
+        defined = defined + parameters
+        body = []
+
+        for _ in range(statements):
+            choice = self.rng.random()
+            if choice < self.assignments:
+                variable = self.name("v")
+                body.append(f"var {variable} = {self.expression(defined, self.depth)}")
+                defined = defined + [variable]
+            elif choice < self.assignments + 0.15:
+                body.append(f"let {self.name('c')} : int = {self.expression(defined, self.depth)}")
+            elif choice < 0.9 or level >= 2:
+                arguments = " ".join(self.operand(defined) for _ in range(self.rng.randint(1, 3)))
+                body.append(f"{self.rng.choice(['print', 'log', 'emit'])}({arguments})")
+            else:
+                # nested functions stay small so programs grow linearly
+                body.append(self.function(defined, level + 1, min(statements, 3)))
+
+        indent = "    " * (level + 1)
+        lines = "".join(f"\n{indent}{line}" for line in body)
+        closing = "    " * level
+        return f"func {self.name('f')}({', '.join(map(self.parameter, parameters))}) {{{lines}\n{closing}}}"
+
+    def parameter(self, name):
+        form = self.rng.randrange(4)
+        if form == 0:
+            return name
+        if form == 1:
+            return f"{name} = {self.rng.randint(0, 99)}"
+        if form == 2:
+            return f"{name}: int"
+        return f"{name}: int = {self.rng.randint(0, 99)}"
+
+    def operand(self, defined):
+        if defined and self.rng.random() < 0.6:
+            return self.rng.choice(defined)
+        if self.rng.random() < 0.5:
+            return str(self.rng.randint(0, 999))
+        return f"{self.rng.randint(0, 99)}.{self.rng.randint(0, 9)}"
+
+    def expression(self, defined, depth):
+        if depth <= 0:
+            return self.operand(defined)
+
+        inner = self.expression(defined, depth - 1)
+        operator = self.rng.choice(["+", "*"])
+        if self.rng.random() < 0.5:
+            return f"( {inner} ) {operator} {self.operand(defined)}"
+        return f"{self.operand(defined)} {operator} ( {inner} )"
@@ -0,0 +1,173 @@
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+from tokenizer import Tokenizer
+from tokenParser import MyParser
+from generator import Generator
+from benchmarks.corpus import SHAPES, generate_program
+
+# size of the smallest program of each shape, doubled for every step
+BASE_SIZES = {
+    "functions": 200,
+    "parameters": 100,
+    "expressions": 16,
+    "statements": 400,
+}
+
+STAGES = ("tokenize", "parse", "generate")
+
+
+def count_nodes(tree):
+    """
+    the number of syntax tree nodes in tree, without recursion
+    """
+    count, stack = 0, [tree]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, tuple) and hasattr(value, "_fields"):
+            count += 1
+            stack.extend(value)
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return count
+
+
+def measure(source, repeat=3):
+    """
+    best time and peak memory of each stage on source,
+    memory is traced on a separate run so it does not slow the timing
+    """
+    stages = (
+        ("tokenize", lambda source: Tokenizer(source).tokenize_store()),
+        ("parse", lambda tokens: MyParser(tokens).parse()),
+        ("generate", lambda tree: Generator(tree).generate()),
+    )
+
+    result = {"characters": len(source)}
+    outputs = {}
+    value = source
+    for stage, function in stages:
+        seconds = math.inf
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = function(value)
+            seconds = min(seconds, time.perf_counter() - start)
+
+        tracemalloc.start()
+        function(value)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        result[stage] = {"seconds": seconds, "peakBytes": peak}
+        value = outputs[stage] = output
+
+    result["tokens"] = len(outputs["tokenize"])
+    result["nodes"] = count_nodes(outputs["parse"])
+    result["bytes"] = len(outputs["generate"].encode())
+
+    for stage, amount, unit in (("tokenize", "tokens", "tokensPerSecond"),
+                                ("parse", "nodes", "nodesPerSecond"),
+                                ("generate", "bytes", "bytesPerSecond")):
+        result[stage][unit] = result[amount] / result[stage]["seconds"] if result[stage]["seconds"] else math.inf
+    return result
+
+
+def scaling(runs):
+    """
+    log2 of how much longer each stage takes when the size doubles,
+    1.0 is linear, 2.0 quadratic
+    """
+    exponents = {stage: [] for stage in STAGES}
+    for smaller, larger in zip(runs, runs[1:]):
+        for stage in STAGES:
+            ratio = larger[stage]["seconds"] / smaller[stage]["seconds"]
+            exponents[stage].append(math.log2(ratio) / math.log2(larger["size"] / smaller["size"]))
+    return exponents
+
+
+def run(shapes=tuple(SHAPES), steps=4, repeat=3, seed=0, scale=1.0, report=print):
+    results = {
+        "version": 1,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "shapes": {},
+    }
+
+    MyParser._codedRules()
+    for shape in shapes:
+        runs = []
+        for step in range(steps):
+            size = max(1, int(BASE_SIZES[shape] * scale)) << step
+            measured = measure(generate_program(shape, size, seed), repeat)
+            measured["size"] = size
+            runs.append(measured)
+
+            report(f"{shape:12} size {size:6}  "
+                   f"{measured['tokenize']['tokensPerSecond']:12,.0f} tokens/s  "
+                   f"{measured['parse']['nodesPerSecond']:10,.0f} nodes/s  "
+                   f"{measured['generate']['bytesPerSecond']:12,.0f} bytes/s  "
+                   f"peak {max(measured[stage]['peakBytes'] for stage in STAGES) / 1e6:7.2f} MB")
+
+        exponents = scaling(runs)
+        report(f"{shape:12} scaling  " + "  ".join(
+            f"{stage} {' '.join(f'{exponent:.2f}' for exponent in exponents[stage])}" for stage in STAGES))
+        results["shapes"][shape] = {"runs": runs, "scaling": exponents}
+
+    return results
+
+
+def compare(previous, current, report=print):
+    """
+    report how the rates of each stage changed between two result files
+    """
+    for shape, data in current["shapes"].items():
+        before = {run["size"]: run for run in previous.get("shapes", {}).get(shape, {}).get("runs", [])}
+        for measured in data["runs"]:
+            old = before.get(measured["size"])
+            if old is None:
+                continue
+
+            changes = []
+            for stage in STAGES:
+                ratio = old[stage]["seconds"] / measured[stage]["seconds"]
+                changes.append(f"{stage} {ratio - 1:+7.1%}")
+            report(f"{shape:12} size {measured['size']:6}  " + "  ".join(changes))
+
+
+def main(argv=None):
+    """
+    python -m benchmarks.run [-o results.json] [--compare old.json] ...
+    """
+    arguments = argparse.ArgumentParser(description="benchmark the tokenizer, parser and generator")
+    arguments.add_argument("--shapes", nargs="+", choices=list(SHAPES), default=list(SHAPES))
+    arguments.add_argument("--steps", type=int, default=4, help="sizes measured, each twice the one before")
+    arguments.add_argument("--scale", type=float, default=1.0, help="multiplies the smallest size of every shape")
+    arguments.add_argument("--repeat", type=int, default=3, help="runs per measurement, the fastest is kept")
+    arguments.add_argument("--seed", type=int, default=0)
+    arguments.add_argument("-o", "--output", default=None, help="file to save the results to as json")
+    arguments.add_argument("--compare", default=None, help="results of an earlier run to compare with")
+    arguments = arguments.parse_args(argv)
+
+    # deep expressions nest deeply in the parser and the generator
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+
+    results = run(arguments.shapes, arguments.steps, arguments.repeat, arguments.seed, arguments.scale)
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if arguments.compare is not None:
+        with open(arguments.compare) as file:
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import hashlib
+import io
+import os
+import pickle
+import sys
+
+try:
+    import fcntl
+except ImportError:
+    # windows
+    fcntl = None
+    import msvcrt
+
+from tokenizer import Tokenizer
+from tokenParser import MyParser
+from generator import Generator
+from pipeline import parse_units
+from astgenerator import AstGenerator, dump_code, load_code
+
+# bump when what is stored changes shape
+_ARTIFACT_CACHE_VERSION = 1
+
+# files an entry can have
+_SUFFIXES = (".py", ".tree", ".pyc")
+
+
+def compiler_fingerprint(parserClass=MyParser, generatorClass=Generator):
+    """
+    hash of the source of every module the tokenizer, parserClass and
+    generatorClass are made of, any edit to them gives a new fingerprint
+    """
+    modules = {Tokenizer.__module__, parse_units.__module__, AstGenerator.__module__}
+    for cls in (*parserClass.__mro__, *generatorClass.__mro__):
+        modules.add(cls.__module__)
+
+    digest = hashlib.sha256(repr((_ARTIFACT_CACHE_VERSION, parserClass.__qualname__, generatorClass.__qualname__)).encode())
+    for name in sorted(modules):
+        path = getattr(sys.modules.get(name), "__file__", None)
+        if path is None:
+            digest.update(name.encode())
+            continue
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    generated code, and optionally the tree, of compiled sources kept
+    in a directory, keyed by a hash of the source and the compiler
+
+        <directory>/<key[:2]>/<key>.py    generated code
+        <directory>/<key[:2]>/<key>.tree  pickled tree, with keepTree
+        <directory>/<key[:2]>/<key>.pyc   code object, from compile_code()
+
+    entries are evicted least recently used first once the directory
+    holds more than maxSize bytes, a hit marks an entry used by touching
+    its files, so the order survives between processes
+
+    processes sharing the directory keep its size in <directory>/size,
+    changed under a lock on <directory>/lock, and look at the whole
+    directory again before they evict, so it stays within maxSize
+    however many of them write to it
+
+    hits, misses and evictions count what this instance did, and what
+    compile_many counted for it in its workers
+
+    example:
+        cache = ArtifactCache(".swftcache")
+        code = cache.compile_file("program.swft")
+        print(cache.stats())
+    """
+
+    def __init__(self, directory, maxSize=256 << 20, parserClass=MyParser, generatorClass=Generator, keepTree=False):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.parserClass = parserClass
+        self.generatorClass = generatorClass
+        self.keepTree = keepTree
+        self.fingerprint = compiler_fingerprint(parserClass, generatorClass)
+
+        self.hits = self.misses = self.evictions = 0
+
+        # key to size of its files, least recently used first, read on first use
+        # and again before evicting, the size is of the directory when read
+        self._entries = None
+        self._size = 0
+
+    def key(self, source):
+        if isinstance(source, str):
+            source = source.encode()
+        return hashlib.sha256(self.fingerprint.encode() + b"\0" + source).hexdigest()
+
+    def compile_file(self, path):
+        with open(path, "rb") as file:
+            return self.compile(file.read())
+
+    def compile(self, source):
+        """
+        the generated code of source, text or utf-8 bytes, from the cache
+        or tokenized, parsed and generated and then stored
+        """
+        key = self.key(source)
+        code = self.get(key)
+        if code is not None:
+            return code
+
+        if isinstance(source, bytes):
+            source = source.decode()
+
+        stream = io.StringIO()
+        tokens = Tokenizer.iter_tokens(io.StringIO(source))
+        if self.keepTree:
+            tree = list(parse_units(tokens, self.parserClass))
+            self.generatorClass(tree).generate_to(stream)
+        else:
+            tree = None
+            self.generatorClass(parse_units(tokens, self.parserClass)).generate_to(stream)
+
+        code = stream.getvalue()
+        self.put(key, code, tree)
+        return code
+
+    def compile_code(self, source, filename="<swft>"):
+        """
+        the python code object of source, text or utf-8 bytes, loaded from
+        the cache or lowered by AstGenerator and then stored as a .pyc,
+        a cached code object keeps the filename it was first compiled with
+        """
+        key = self.key(source)
+        code = self.get_code(key, source)
+        if code is not None:
+            return code
+
+        text = source.decode() if isinstance(source, bytes) else source
+        tree = list(parse_units(Tokenizer.iter_tokens(io.StringIO(text)), self.parserClass))
+        code = AstGenerator(tree).compile(filename)
+        self.put_code(key, code, source)
+        return code
+
+    def get(self, key):
+        """
+        the code stored for key, None when it is not cached
+        """
+        try:
+            with open(self._path(key, ".py"), "r") as file:
+                code = file.read()
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touch(key)
+        return code
+
+    def get_code(self, key, source=None):
+        """
+        the code object stored for key, None when it is not cached
+        or was written by another python version, or with source,
+        when it was not written for source
+        """
+        try:
+            with open(self._path(key, ".pyc"), "rb") as file:
+                code = load_code(file.read(), source)
+        except (OSError, EOFError, ValueError, TypeError):
+            code = None
+
+        if code is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touch(key)
+        return code
+
+    def load_tree(self, key):
+        """
+        the tree stored for key, None when there is none
+        """
+        try:
+            with open(self._path(key, ".tree"), "rb") as file:
+                return pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def put(self, key, code, tree=None):
+        files = [(".py", code.encode())]
+        if tree is not None:
+            files.append((".tree", pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL)))
+        self._write(key, files)
+
+    def put_code(self, key, code, source=b""):
+        self._write(key, [(".pyc", dump_code(code, source))])
+
+    def _write(self, key, files):
+        try:
+            os.makedirs(os.path.dirname(self._path(key, ".py")), exist_ok=True)
+            temporaries = []
+            for suffix, data in files:
+                path = self._path(key, suffix)
+                temporary = f"{path}.{os.getpid()}.tmp"
+                with open(temporary, "wb") as file:
+                    file.write(data)
+                temporaries.append((temporary, path))
+
+            with self._locked():
+                size = self._sharedSize()
+
+                # the other files of the entry are kept
+                before = self._entrySize(key)
+                for temporary, path in temporaries:
+                    os.replace(temporary, path)
+                size += self._entrySize(key) - before
+
+                if size > self.maxSize:
+                    # the other processes wrote entries this one has not seen
+                    self._entries = None
+                    self._index()
+                    self._evict()
+                    size = self._size
+                self._storeSize(size)
+        except OSError:
+            return
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        entries = self._rescan()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "entries": len(entries),
+            "size": self._size,
+        }
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    def _entrySize(self, key):
+        size = 0
+        for suffix in _SUFFIXES:
+            try:
+                size += os.path.getsize(self._path(key, suffix))
+            except OSError:
+                pass
+        return size
+
+    def _touch(self, key):
+        for suffix in _SUFFIXES:
+            try:
+                os.utime(self._path(key, suffix))
+            except OSError:
+                pass
+
+        entries = self._index()
+        if key in entries:
+            entries.move_to_end(key)
+
+    def _rescan(self):
+        self._entries = None
+        return self._index()
+
+    def _index(self):
+        """
+        the entries in the directory, oldest first by modification time
+        """
+        if self._entries is not None:
+            return self._entries
+
+        found = {}
+        for root, directories, files in os.walk(self.directory):
+            for name in files:
+                key, suffix = os.path.splitext(name)
+                if suffix not in _SUFFIXES:
+                    continue
+                try:
+                    status = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                size, used = found.get(key, (0, 0))
+                found[key] = (size + status.st_size, max(used, status.st_mtime))
+
+        self._entries = OrderedDict((key, size) for key, (size, used) in sorted(found.items(), key=lambda item: item[1][1]))
+        self._size = sum(self._entries.values())
+        return self._entries
+
+    @contextmanager
+    def _locked(self):
+        """
+        the directory locked against the other processes writing to it
+        """
+        with open(os.path.join(self.directory, "lock"), "a+b") as file:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+                else:
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _sharedSize(self):
+        """
+        the size of the directory every process adds its writes to,
+        found by looking at the files when it was not kept yet
+        """
+        try:
+            with open(os.path.join(self.directory, "size"), "r") as file:
+                return int(file.read())
+        except (OSError, ValueError):
+            self._rescan()
+            return self._size
+
+    def _storeSize(self, size):
+        path = os.path.join(self.directory, "size")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            file.write(str(size))
+        os.replace(temporary, path)
+
+    def _evict(self):
+        entries = self._index()
+        while self._size > self.maxSize and len(entries) > 1:
+            key, size = entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            for suffix in _SUFFIXES:
+                try:
+                    os.remove(self._path(key, suffix))
+                except OSError:
+                    pass
@@ -4,100 +4,317 @@ import inspect
 # therefore it wouldn't know self._decorated_methods
 
 
+class IndentedWriter:
+    """
+    writes text to a stream, starting every non empty line
+    with 4 spaces per indentation level
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.level = 0
+        self.atLineStart = True
+
+    def write(self, text):
+        lines = text.split("\n")
+        for i, line in enumerate(lines):
+            if i:
+                self.stream.write("\n")
+                self.atLineStart = True
+            if line:
+                if self.atLineStart:
+                    self.stream.write(" " * (4 * self.level))
+                    self.atLineStart = False
+                self.stream.write(line)
+
+
+class SymbolTable:
+    """
+    names defined in nested scopes, a scope is opened per function
+
+        visible  name to the kinds it is defined as, innermost last
+        scopes   the names defined in each open scope, outermost first
+
+    defining and looking up a name is a single dict access, closing a
+    scope forgets what was defined in it and uncovers outer definitions
+    """
+
+    def __init__(self):
+        self.visible = {}
+        self.scopes = [{}]
+
+    def push(self):
+        self.scopes.append({})
+
+    def pop(self):
+        for name in self.scopes.pop():
+            kinds = self.visible[name]
+            kinds.pop()
+            if not kinds:
+                del self.visible[name]
+
+    def define(self, name, kind="dynamic"):
+        scope = self.scopes[-1]
+        if name in scope:
+            self.visible[name][-1] = kind
+        else:
+            self.visible.setdefault(name, []).append(kind)
+        scope[name] = kind
+
+    def lookup(self, name):
+        """
+        the kind of the innermost definition of name, None if not defined
+        """
+        kinds = self.visible.get(name)
+        return kinds[-1] if kinds else None
+
+    def names(self, kind):
+        return [name for name, kinds in self.visible.items() if kinds[-1] == kind]
+
+    def __contains__(self, name):
+        return name in self.visible
+
+
+# binding power of the operators in python, an operation needs
+# parentheses only where python would group it differently
+_BINDING_POWERS = {
+    "+": 1,
+    "-": 1,
+    "*": 2,
+}
+
+
+def walk_operations(expr1, operator, expr2, operand, operation):
+    """
+    the result of operation(left, operator, right) called bottom up for
+    the operation expr1 operator expr2 and every BinaryOperationNode in
+    it, and of operand(node) for every other node, left to right
+
+    nested operations are kept on a list instead of the call stack,
+    so chains of thousands of operands do not hit the recursion limit
+    """
+    results, stack = [], [(True, operator), (False, expr2), (False, expr1)]
+    while stack:
+        isOperator, value = stack.pop()
+        if isOperator:
+            right = results.pop()
+            results.append(operation(results.pop(), value, right))
+        elif value.__class__.__name__ == "BinaryOperationNode":
+            stack += ((True, value.operator), (False, value.expr2), (False, value.expr1))
+        else:
+            results.append(operand(value))
+    return results[0]
+
+
 class Generator:
     _decorated_methods = []
+    _handlers = {}
+    _streamers = {}
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        collect the decorated methods of the class into _handlers,
+        node class name to method, inherited handlers can be overridden
+        """
+        super().__init_subclass__(**kwargs)
+
+        handlers, streamers = {}, {}
+        for value in cls.__dict__.values():
+            if hasattr(value, 'parameters'):
+                assert value.parameters not in handlers, f"too many avalable decorators with name {value.parameters}"
+                handlers[value.parameters] = value
+            if hasattr(value, 'streams'):
+                streamers[value.streams] = value
+
+        cls._handlers = {**cls._handlers, **handlers}
+        cls._streamers = {**cls._streamers, **streamers}
 
 
 class Generator(Generator):
     def __init__(self, ast):
         self.ast = ast
-
-        self.defined_dynamic_variables = []
-        self.defined_static_variables = []
+        self.symbols = SymbolTable()
 
     def generate(self):
         code = []
-        for expr in self.ast:
+        for expr in self._topLevel():
             func = self._get_method(expr.__class__.__name__)
-            code.append(func(self, expr))
+            code.append(str(func(self, expr)))
         return "\n".join(code)
 
+    def generate_to(self, stream):
+        """
+        write the same text as generate() to a text stream while walking
+        the tree, nodes with a _stream method write their children one
+        by one, any other node is written as its handler returns it
+
+        indentation is left to the IndentedWriter, so no text is copied
+        once per nesting level and memory grows with the depth of the tree
+        """
+        writer = IndentedWriter(stream)
+        for i, expr in enumerate(self._topLevel()):
+            if i:
+                writer.write("\n")
+            self._streamNode(self._get_method(expr.__class__.__name__), expr, writer)
+
+    def _topLevel(self):
+        """
+        the nodes of the tree, statements and expressions
+        at the top level are parsed into lists
+        """
+        for expr in self.ast:
+            if type(expr) is list:
+                yield from expr
+            else:
+                yield expr
+
+    def _streamNode(self, handler, node, writer):
+        streamer = self._streamers.get(node.__class__.__name__)
+        if streamer is not None:
+            streamer(self, node, writer)
+        else:
+            writer.write(str(handler(self, node, indent=0)))
+
+    def _streamChild(self, node, writer):
+        handler = self._handlers.get(node.__class__.__name__)
+        if handler is not None:
+            self._streamNode(handler, node, writer)
+        else:
+            writer.write(str(node))
+
+    @property
+    def defined_dynamic_variables(self):
+        return self.symbols.names("dynamic")
+
+    @property
+    def defined_static_variables(self):
+        return self.symbols.names("static")
+
     @property
     def defined_variables(self):
         return self.defined_dynamic_variables + self.defined_static_variables
 
     @defined_variables.setter
     def defined_variables(self, value):
-        if value.isupper():
-            self.defined_static_variables.append(value)
-        else:
-            self.defined_dynamic_variables.append(value)
-
-    def _(parameters: str, shouldIndent=False):
+        self.symbols.define(value, "static" if value.isupper() else "dynamic")
+
+    def _(parameters: str, shouldIndent=False, opensScope=False, childNodes=False):
+        """
+        marks the method generating nodes of class parameters, it is called
+        with the code of every field of the node, or with the fields
+        themselves when childNodes is set
+        """
         def decorator(func):
-            def wrapper(self, node, indent=0):
-                arguments = inspect.getargspec(func).args[1:]
+            # the fields of the node are passed in order, by these names
+            arguments = inspect.getfullargspec(func).args[1:]
 
+            def wrapper(self, node, indent=0):
                 if shouldIndent:
                     kwargs = {'indent': indent}
                 else:
                     kwargs = {}
 
-                for key, value in zip(arguments, node._asdict().values()):
-                    if type(value) in (list, tuple):
-                        value_list = []
-                        for subvalue in value:
-                            value_list.append(self._tryGenerating(subvalue, indent))
-                        kwargs[key] = value_list
-                    else:
-                        kwargs[key] = self._tryGenerating(value, indent)
-
-                return func(self, **kwargs)
-
+                # names defined by the children are forgotten
+                # once the node is generated
+                if opensScope:
+                    self.symbols.push()
+
+                try:
+                    tryGenerating = self._tryGenerating
+                    for key, value in zip(arguments, node):
+                        if childNodes:
+                            kwargs[key] = value
+                        elif type(value) in (list, tuple):
+                            kwargs[key] = [tryGenerating(subvalue, indent) for subvalue in value]
+                        else:
+                            kwargs[key] = tryGenerating(value, indent)
+
+                    return func(self, **kwargs)
+                finally:
+                    if opensScope:
+                        self.symbols.pop()
+
+            wrapper.parameters = parameters
             Generator._decorated_methods.append((parameters, wrapper))
             return wrapper
         return decorator
 
+    def _stream(parameters: str):
+        """
+        marks the method writing nodes of class parameters in generate_to(),
+        it gets the node and the IndentedWriter and has to write what
+        the handler of the node would return at indent 0
+        """
+        def decorator(func):
+            func.streams = parameters
+            return func
+        return decorator
+
     def _is_method_avalable(self, method_name):
-        return method_name in self._get_avalable_methods()
+        return method_name in self._handlers
 
     def _get_avalable_methods(self):
-        return list(map(lambda method: method[0], self._decorated_methods))
+        return list(self._handlers)
 
     def _get_method(self, withName):
-        avalable_decorators = list(filter(lambda method: method[0] == withName, self._decorated_methods))
-        assert len(avalable_decorators) == 1, f"too many or too little avalable decorators with name {withName}, got {avalable_decorators}, {len(avalable_decorators)}"
-        return avalable_decorators[0][1]
+        assert withName in self._handlers, f"no avalable decorator with name {withName}"
+        return self._handlers[withName]
 
     def _tryGenerating(self, method_name, indent):
-        if self._is_method_avalable(method_name.__class__.__name__):
-            return self._get_method(method_name.__class__.__name__)(self, method_name, indent=indent + 1)
+        handler = self._handlers.get(method_name.__class__.__name__)
+        if handler is not None:
+            return handler(self, method_name, indent=indent + 1)
         else:
             return method_name
 
-    @_("FunctionNode", shouldIndent=True)
+    @_("FunctionNode", shouldIndent=True, opensScope=True)
     def generate_function_definition(self, name, parameters, body, indent=0):
         offset = " " * (4 * indent)
         parameters = ", ".join(parameters)
-        body = "\n".join(body)
+        # a function needs at least one statement
+        body = "\n".join(body) or offset + "    pass"
         return offset + f"def {name}({parameters}): \n{body}\n"
 
+    @_stream("FunctionNode")
+    def stream_function_definition(self, node, writer):
+        name = self._tryGenerating(node.name, 0)
+
+        self.symbols.push()
+        try:
+            parameters = ", ".join([self._tryGenerating(parameter, 0) for parameter in node.parameters])
+            writer.write(f"def {name}({parameters}): \n")
+
+            writer.level += 1
+            for i, statement in enumerate(node.body):
+                if i:
+                    writer.write("\n")
+                self._streamChild(statement, writer)
+            if not node.body:
+                writer.write("pass")
+            writer.level -= 1
+        finally:
+            self.symbols.pop()
+
+        writer.write("\n")
+
     @_("ParameterNode")
     def generate_parameter(self, hint, name, param_type, default):
-        self.defined_dynamic_variables.append(name)
+        self.symbols.define(name, "dynamic")
 
         return f"{name}: {param_type} = {default}" if param_type is not 'Any' else f"{name} = {default}"
 
     @_("StaticAssignmentNode", shouldIndent=True)
     def generate_statassign(self, name, param_type, value, indent=0):
-        self.defined_static_variables.append(name.upper())
+        # statics are upper case, the name of a let refers to it from here
+        self.symbols.define(name, "let")
+        self.symbols.define(name.upper(), "static")
 
         offset = " " * (4 * indent)
         return offset + f"{name.upper()}: {param_type} = {value}" if param_type is not 'Any' else offset + f"{name.upper()} = {value}"
 
     @_("DynamicAssignmentNode", shouldIndent=True)
     def generate_dynassing(self, name, param_type, value, indent=0):
-        self.defined_dynamic_variables.append(name)
+        self.symbols.define(name, "dynamic")
 
         offset = " " * (4 * indent)
         return offset + f"{name}: {param_type} = {value}" if param_type is not 'Any' else offset + f"{name} = {value}"
@@ -107,8 +324,8 @@ class Generator(Generator):
         offset = " " * (4 * indent)
 
         for i, parameter in enumerate(parameters):
-            if type(parameter) is str:
-                assert parameter in self.defined_variables, "variable {parameter} is not defined"
+            if type(parameter) is str and parameter.isidentifier():
+                assert parameter in self.symbols, f"variable {parameter} is not defined"
 
             else:
                 parameters[i] = str(parameter)
@@ -117,9 +334,29 @@ class Generator(Generator):
 
         return offset + f"{name}( {parameters} )"
 
+    @_("BinaryOperationNode", childNodes=True)
+    def generate_binary_operation(self, expr1, operator, expr2):
+        # the tree already groups the operations, an operand which is an
+        # operation is kept together unless python groups it the same way,
+        # operators python does not know are always kept together
+        def operand(node):
+            return str(self._tryGenerating(node, 0)), None
+
+        def operation(left, operator, right):
+            power = _BINDING_POWERS.get(operator)
+            (left, leftOperator), (right, rightOperator) = left, right
+
+            if leftOperator is not None and (power is None or _BINDING_POWERS.get(leftOperator, 0) < power):
+                left = f"({left})"
+            if rightOperator is not None and (power is None or _BINDING_POWERS.get(rightOperator, 0) <= power):
+                right = f"({right})"
+            return f"{left} {operator} {right}", operator
+
+        return walk_operations(expr1, operator, expr2, operand, operation)[0]
+
     @_("IdentifierNode")
     def generate_identifier(self, value):
-        return value
+        return value.upper() if self.symbols.lookup(value) == "let" else value
 
     @_("LiteralNode")
     def generate_literal(self, value):
@@ -0,0 +1,127 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from tokenizer import Token, TokenType, compile_token_types, _whitespace
+from tokenParser import MyParser
+from pipeline import parse_unit_spans
+
+
+class IncrementalParser:
+    """
+    keeps the tree of a program up to date while its text is edited,
+    for editors and file watchers
+
+    the tree is kept per SOF unit together with the characters the unit
+    spans and the end of the last token its parse looked at
+
+    an edit re-lexes from the first unit whose parse looked at a token
+    the edit may change and re-parses units until one ends where an old
+    unit after the edit starts, from there on the old units are kept,
+    so a one line edit costs about one top level declaration whatever
+    the size of the file
+
+    the tree is always the same as parsing the whole text again, when
+    an edit does not parse the whole text is parsed to raise the same
+    error, the tree is None and the next edit starts from scratch
+
+    example:
+        parser = IncrementalParser(open('program.swft').read())
+        tree = parser.edit(120, 1, "x")
+        tree == MyParser(Tokenizer(parser.source).tokenize()).parse()
+    """
+
+    def __init__(self, source, parserClass=MyParser, **parserOptions):
+        self.parserClass = parserClass
+        self.parserOptions = parserOptions
+        self.source = source
+
+        # per unit: its tree, first and last character and how far its parse looked
+        self.tree = None
+        self._starts = []
+        self._ends = []
+        self._reaches = []
+        self._maxReaches = []
+
+        # tokens lexed and units parsed by the last edit
+        self.relexed = self.reparsed = 0
+
+        self._reparse(0, 0, None)
+
+    def edit(self, offset, deleted, inserted):
+        """
+        replace deleted characters at offset with inserted,
+        returns the new tree
+        """
+        if offset < 0 or deleted < 0 or offset + deleted > len(self.source):
+            raise ValueError(f"edit of {deleted} characters at {offset} is outside the source")
+
+        old = self.source
+        self.source = old[:offset] + inserted + old[offset + deleted:]
+
+        # no token spans whitespace, so tokens before the run of
+        # characters around the edit are lexed as before
+        run = offset
+        while run > 0 and not old[run - 1].isspace():
+            run -= 1
+
+        first = bisect_right(self._maxReaches, run)
+        try:
+            self._reparse(first, len(inserted) - deleted, offset + deleted)
+        except Exception:
+            self.tree, self._starts, self._ends, self._reaches, self._maxReaches = None, [], [], [], []
+            self._reparse(0, 0, None)
+        return self.tree
+
+    def _reparse(self, first, delta, editEnd):
+        """
+        lex and parse from unit first on, until a unit ends where
+        an old unit starting at or after editEnd starts, delta characters
+        later, or to the end when editEnd is None
+        """
+        source = self.source
+        regex = compile_token_types(TokenType())
+        starts, ends = [], []
+
+        def lex(position):
+            while position < len(source):
+                match = regex.match(source, position)
+                if match is None:
+                    raise RuntimeError("Couldn't match token on {}".format(source[position:]))
+
+                starts.append(position)
+                ends.append(match.end())
+                yield Token(match.lastgroup, match.group())
+                position = _whitespace.match(source, match.end()).end()
+
+        oldTree = self.tree or []
+        tree, unitStarts, unitEnds, reaches = oldTree[:first], self._starts[:first], self._ends[:first], self._reaches[:first]
+        position = self._starts[first] if first < len(self._starts) else 0
+        index = reparsed = 0
+        kept = len(self._starts)
+
+        for unit, length, reach in parse_unit_spans(lex(position), self.parserClass, **self.parserOptions):
+            tree.append(unit)
+            unitStarts.append(starts[index])
+            unitEnds.append(ends[index + length - 1])
+
+            last = index + reach - 1
+            reaches.append(ends[last] if last < len(ends) else len(source) + 1)
+
+            index += length
+            reparsed += 1
+
+            # from an old unit after the edit on the text,
+            # and so the tokens and units, are the same
+            if editEnd is not None and index < len(starts) and starts[index] - delta >= editEnd:
+                old = bisect_left(self._starts, starts[index] - delta, first)
+                if old < len(self._starts) and self._starts[old] == starts[index] - delta:
+                    kept = old
+                    break
+
+        self.tree = tree + oldTree[kept:]
+        self._starts = unitStarts + [start + delta for start in self._starts[kept:]]
+        self._ends = unitEnds + [end + delta for end in self._ends[kept:]]
+        self._reaches = reaches + [reach + delta for reach in self._reaches[kept:]]
+        self._maxReaches = list(accumulate(self._reaches, max))
+
+        self.relexed, self.reparsed = len(starts), reparsed
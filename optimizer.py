@@ -0,0 +1,223 @@
+import argparse
+from collections import Counter
+import math
+import operator
+import sys
+
+from tokenizer import Tokenizer
+from tokenParser import (MyParser, FunctionNode, DynamicAssignmentNode, StaticAssignmentNode,
+                         CallNode, BinaryOperationNode, IdentifierNode, LiteralNode)
+from generator import Generator, walk_operations
+
+# operators folded when both operands are number literals
+_ARITHMETIC = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+}
+
+
+def optimize(tree, level=1):
+    """
+    the optimized copy of tree, see Optimizer
+    """
+    return Optimizer(level).optimize(tree)
+
+
+class Optimizer:
+    """
+    rewrites a tree from the parser into one which generates
+    code doing the same with less work at runtime
+
+    levels:
+        0   nothing is changed
+        1   operations on two literals are folded into one literal
+        2   also every use of a let bound to a literal is replaced by the
+            literal, and a let which is then not used is dropped
+
+    a let is only propagated when it is the one binding of its name in
+    its function, a function nested in it sees the constant unless it
+    binds the name itself, as in the generated python
+
+    the tree given is not changed, changes lists what was done in order
+
+    example:
+        optimizer = Optimizer(level=2)
+        code = Generator(optimizer.optimize(tree)).generate()
+        print(optimizer.report())
+    """
+
+    def __init__(self, level=1):
+        self.level = level
+        self.changes = []
+        self.counts = Counter(folded=0, propagated=0, removed=0)
+
+    def optimize(self, tree):
+        if self.level <= 0:
+            return tree
+
+        # the top level is one scope, whichever unit a statement was parsed in
+        units = [unit if type(unit) is list else [unit] for unit in tree]
+        statements = iter(self._scope([statement for unit in units for statement in unit], {}, ()))
+
+        optimized = []
+        for unit, original in zip(units, tree):
+            kept = [statement for statement in (next(statements) for _ in unit) if statement is not None]
+            if type(original) is list:
+                if kept:
+                    optimized.append(kept)
+            else:
+                optimized.extend(kept)
+        return optimized
+
+    def report(self):
+        lines = list(self.changes)
+        lines.append(f"folded {self.counts['folded']} operations, propagated {self.counts['propagated']} constants, "
+                     f"removed {self.counts['removed']} bindings")
+        return "\n".join(lines)
+
+    def _scope(self, statements, constants, parameters):
+        """
+        the statements of one function, or of the top level, optimized,
+        None in place of every statement that was dropped
+        """
+        bound = Counter(parameters)
+        for statement in statements:
+            if type(statement) in (DynamicAssignmentNode, StaticAssignmentNode, FunctionNode):
+                bound[statement.name.value] += 1
+
+        # a name bound here is local to the whole function
+        constants = {name: literal for name, literal in constants.items() if name not in bound}
+
+        optimized, lets = [], {}
+        for statement in statements:
+            statement = self._statement(statement, constants)
+            optimized.append(statement)
+
+            if self.level >= 2 and type(statement) is StaticAssignmentNode and type(statement.value) is LiteralNode:
+                name = statement.name.value
+                if bound[name] == 1:
+                    constants[name] = statement.value
+                    lets[len(optimized) - 1] = name
+
+        #
+        # dropUnusedLets(optimized)
+        #
+        if lets:
+            uses = Counter()
+            for statement in optimized:
+                self._countUses(statement, uses)
+
+            for index, name in lets.items():
+                if not uses[name]:
+                    optimized[index] = None
+                    self.counts["removed"] += 1
+                    self.changes.append(f"removed unused let {name}")
+
+        return optimized
+
+    def _statement(self, node, constants):
+        if type(node) is FunctionNode:
+            parameters = [parameter.name.value for parameter in node.parameters]
+            body = [statement for statement in self._scope(node.body, constants, parameters) if statement is not None]
+            return node._replace(body=body)
+
+        if type(node) in (DynamicAssignmentNode, StaticAssignmentNode):
+            return node._replace(value=self._expression(node.value, constants))
+
+        if type(node) is CallNode:
+            return node._replace(arguments=[self._expression(argument, constants) for argument in node.arguments])
+
+        return self._expression(node, constants)
+
+    def _expression(self, node, constants):
+        if type(node) is IdentifierNode:
+            literal = constants.get(node.value)
+            if literal is None:
+                return node
+            self.counts["propagated"] += 1
+            self.changes.append(f"replaced {node.value} with {literal.value}")
+            return literal
+
+        if type(node) is BinaryOperationNode:
+            return walk_operations(node.expr1, node.operator, node.expr2,
+                                   lambda operand: self._expression(operand, constants), self._operation)
+
+        return node
+
+    def _operation(self, expr1, operator, expr2):
+        folded = self._fold(expr1, operator, expr2)
+        if folded is None:
+            return BinaryOperationNode(expr1, operator, expr2)
+
+        self.counts["folded"] += 1
+        self.changes.append(f"folded {expr1.value} {operator} {expr2.value} to {folded.value}")
+        return folded
+
+    @staticmethod
+    def _fold(expr1, operator, expr2):
+        """
+        the literal expr1 operator expr2 evaluates to,
+        None when it is not known before runtime
+        """
+        if type(expr1) is not LiteralNode or type(expr2) is not LiteralNode:
+            return None
+        left, right = expr1.value, expr2.value
+
+        # string literals are kept with their quotes
+        if type(left) is str and type(right) is str:
+            if operator == "+":
+                return LiteralNode(left[:-1] + right[1:])
+            return None
+
+        if type(left) not in (int, float) or type(right) not in (int, float) or operator not in _ARITHMETIC:
+            return None
+
+        value = _ARITHMETIC[operator](left, right)
+
+        # inf and nan have no literal
+        if type(value) is float and not math.isfinite(value):
+            return None
+        return LiteralNode(value)
+
+    @staticmethod
+    def _countUses(node, uses):
+        # walked with a stack, operations can be thousands deep
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if type(node) is IdentifierNode:
+                uses[node.value] += 1
+            elif type(node) is FunctionNode:
+                stack.extend(node.body)
+            elif type(node) in (DynamicAssignmentNode, StaticAssignmentNode):
+                stack.append(node.value)
+            elif type(node) is CallNode:
+                stack.extend(node.arguments)
+            elif type(node) is BinaryOperationNode:
+                stack += (node.expr1, node.expr2)
+            elif type(node) is list:
+                stack.extend(node)
+
+
+def main(argv=None):
+    """
+    python optimizer.py program.swft [-O 2]
+
+    prints the generated code and, on stderr, what was changed
+    """
+    arguments = argparse.ArgumentParser(description="compile a .swft file with optimizations")
+    arguments.add_argument("path")
+    arguments.add_argument("-O", "--level", type=int, default=2, help="0 off, 1 folding, 2 folding and constant propagation")
+    arguments = arguments.parse_args(argv)
+
+    with open(arguments.path) as file:
+        tree = MyParser(Tokenizer(file.read()).tokenize_store()).parse()
+
+    optimizer = Optimizer(arguments.level)
+    print(Generator(optimizer.optimize(tree)).generate())
+    print(optimizer.report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import sys
+
+from tokenizer import Tokenizer, TokenStore
+from tokenParser import MyParser, ParseError
+from generator import Generator
+
+
+def parse_units(tokens, parserClass=MyParser, **parserOptions):
+    """
+    lazily parse tokens one SOF unit at a time, yielding the same
+    subtrees as parserClass(list(tokens)).parse()
+
+    tokens are read into a window up to the next '}' closing a top level
+    block and one token past it, then a unit is parsed from the window
+    only, a unit is kept when its parse ended before the end of the
+    window and no alternative failed there, so more tokens could not
+    have changed it, otherwise the window grows by whole blocks to at
+    least twice its length, so a unit spanning many blocks is reparsed
+    a logarithmic number of times and the reparsing stays linear
+
+    the tokens of a unit are dropped once it is yielded, so memory is
+    bounded by twice the largest top level declaration instead of the file
+
+    parse errors report token positions in the whole stream
+    """
+    for unit, length, reach in parse_unit_spans(tokens, parserClass, **parserOptions):
+        yield unit
+
+
+def parse_unit_spans(tokens, parserClass=MyParser, **parserOptions):
+    """
+    parse_units, yielding (unit, length, reach) where length is the
+    number of tokens of the unit and reach the number of tokens from
+    its start its parse looked at, the token after it counts as looked at
+    """
+    tokens = iter(tokens)
+    window, base, length = [], 0, 0
+    depth, exhausted = 0, False
+
+    # the farthest failure is kept across units like in one parser
+    farthest, expected = -1, set()
+
+    while True:
+
+        # readWindow()
+        #
+        # up to the token after a top level '}' once the window is
+        # length tokens long, or the end
+        #
+        closed = False
+        while not exhausted:
+            token = next(tokens, None)
+            if token is None:
+                exhausted = True
+                break
+
+            window.append(token)
+            if closed and len(window) >= length:
+                break
+
+            closed = False
+            if token.type == "char":
+                if token.value == "{":
+                    depth += 1
+                elif token.value == "}" and depth > 0:
+                    depth -= 1
+                    closed = depth == 0
+
+        # parseUnits()
+        #
+        # every unit the window is long enough for, a window too short
+        # for the next unit is doubled before it is parsed again
+        #
+        length = 2 * len(window)
+        while window:
+            parser = parserClass(TokenStore.fromTokens(window, base), **parserOptions)
+            parser._farthest, parser._expected = farthest, set(expected)
+            try:
+                unit = parser.parse_start_of_file(debug=False)
+            except ParseError as e:
+                if not exhausted and e.index - base >= len(window):
+                    break
+                raise
+
+            end = parser.executeIndex
+            if not exhausted and (end >= len(window) or parser._farthest >= len(window)):
+                break
+
+            yield unit, end, max(end, parser._farthest) + 1
+            del window[:end]
+            base += end
+            farthest, expected = parser._farthest - end, parser._expected
+
+        if exhausted and not window:
+            return
+
+
+def compile_to(source, stream, parserClass=MyParser, generatorClass=Generator, chunk_size=1 << 16):
+    """
+    tokenize, parse and generate source into a text stream, the code
+    of every top level declaration is written as soon as it is parsed
+
+    source is anything Tokenizer.iter_tokens reads, a path,
+    a file object or an mmap
+
+    the output is the same as generating the whole tree at once
+    """
+    tokens = Tokenizer.iter_tokens(source, chunk_size)
+    generatorClass(parse_units(tokens, parserClass)).generate_to(stream)
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or ['functions.swft']:
+        compile_to(path, sys.stdout)
+        sys.stdout.write("\n")
@@ -0,0 +1,16 @@
+import pytest
+
+from arena import NodeArena
+from benchmarks.corpus import generate_program
+from generator import Generator
+from tokenizer import Tokenizer
+from tokenParser import MyParser
+
+
+@pytest.mark.parametrize("shape", ["functions", "statements", "expressions", "parameters"])
+def test_arena_keeps_the_tree(shape):
+    tree = MyParser(Tokenizer(generate_program(shape, 3)).tokenize_store()).parse()
+    arena = NodeArena.fromTree(tree)
+
+    assert arena.toTree() == tree
+    assert Generator(arena).generate() == Generator(tree).generate()
@@ -0,0 +1,29 @@
+import importlib.util
+
+from astgenerator import compile_tree, dump_code, load_code
+from cache import ArtifactCache
+from tokenizer import Tokenizer
+from tokenParser import MyParser
+
+
+def compile_source(source):
+    return compile_tree(MyParser(Tokenizer(source).tokenize_store()).parse())
+
+
+def test_pyc_is_checked_against_the_hash_of_its_source():
+    source = "print(1)\n"
+    data = dump_code(compile_source(source), source)
+
+    assert int.from_bytes(data[4:8], "little") == 0b11
+    assert data[8:16] == importlib.util.source_hash(source.encode())
+    assert load_code(data, source) is not None
+    assert load_code(data, "print(2)\n") is None
+
+
+def test_cache_does_not_load_code_written_for_another_source(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    key = cache.key("print(1)\n")
+    cache.put_code(key, compile_source("print(2)\n"), "print(2)\n")
+
+    assert cache.get_code(key, "print(1)\n") is None
+    assert cache.get_code(key, "print(2)\n") is not None
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+import batch
+from benchmarks.corpus import generate_program
+from cache import ArtifactCache
+from tokenizer import Tokenizer
+from tokenParser import MyParser, ParseError
+
+
+def test_files_of_the_same_name_do_not_overwrite_each_other(tmp_path):
+    for folder, value in (("a", 1), ("b", 2)):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "x.swft").write_text(f"print({value})")
+
+    output = tmp_path / "out"
+    assert batch.main(["-j", "1", "-o", str(output), str(tmp_path / "a" / "x.swft"), str(tmp_path / "b" / "x.swft")]) == 0
+
+    assert "1" in (output / "a" / "x.py").read_text()
+    assert "2" in (output / "b" / "x.py").read_text()
+
+
+def test_files_of_one_directory_are_written_flat(tmp_path):
+    assert batch._targets([os.path.join("src", "x.swft"), os.path.join("src", "y.swft")], "out") == \
+        [os.path.join("out", "x.py"), os.path.join("out", "y.py")]
+    assert batch._targets(["x.swft"]) == ["x.py"]
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names if name.endswith((".py", ".tree", ".pyc")))
+
+
+def test_workers_keep_the_cache_within_its_size(tmp_path):
+    paths = []
+    for index in range(40):
+        path = tmp_path / f"f{index}.swft"
+        path.write_text(f"func f{index}(a) {{\n    print(a + {index})\n}}\nf{index}({index})\n")
+        paths.append(str(path))
+
+    cache = ArtifactCache(str(tmp_path / "cache"), maxSize=500)
+    results = batch.compile_many(paths, workers=4, cache=cache)
+
+    assert all(result.error is None for result in results)
+    assert directory_size(cache.directory) <= 500
+    assert cache.stats()["evictions"] > 0
+
+
+def test_stats_of_every_worker_are_counted(tmp_path):
+    paths = []
+    for index in range(12):
+        path = tmp_path / f"f{index}.swft"
+        path.write_text(f"print({index})\n")
+        paths.append(str(path))
+    (tmp_path / "bad.swft").write_text("x = = 1\n")
+    paths.append(str(tmp_path / "bad.swft"))
+
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    batch.compile_many(paths, workers=4, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 13)
+
+    results = batch.compile_many(paths, workers=4, cache=cache)
+    assert [result.cached for result in results] == [True] * 12 + [False]
+    assert (cache.hits, cache.misses) == (12, 14)
+    assert cache.stats()["entries"] == 12
+
+
+def serial(source):
+    return MyParser(Tokenizer(source).tokenize_store()).parse()
+
+
+def test_parallel_parse_is_the_serial_parse():
+    source = generate_program("functions", 12)
+
+    assert batch.parse_parallel(source, workers=2, chunks=6) == serial(source)
+
+
+def test_parallel_parse_of_units_past_a_block():
+    functions = "".join(f"func f{index}(a) {{\n    print(a)\n}}\n" for index in range(8))
+
+    # a unit of statements goes on over the '}' of every function
+    for source in ("print(1)\n" + functions, functions + "print(1)\n" + functions + "print(2)\n"):
+        assert batch.parse_parallel(source, workers=2, chunks=8) == serial(source)
+
+
+def test_parallel_parse_raises_the_serial_error():
+    functions = "".join(f"func f{index}(a) {{\n    print(a)\n}}\n" for index in range(8))
+
+    # the second error is in the token right after a cut
+    for source in (functions + "x = = 1\n" + functions, functions + "func g() {} + 1\n" + functions):
+        with pytest.raises(ParseError) as expected:
+            serial(source)
+        with pytest.raises(ParseError) as error:
+            batch.parse_parallel(source, workers=2, chunks=8)
+        assert (error.value.index, error.value.expected) == (expected.value.index, expected.value.expected)
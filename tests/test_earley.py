@@ -0,0 +1,40 @@
+from benchmarks.corpus import generate_program
+from tokenizer import Tokenizer
+from tokenParser import MyParser
+
+
+class EarleyParser(MyParser, engine="earley"):
+    pass
+
+
+class StackParser(MyParser, engine="stack"):
+    pass
+
+
+def chart_items(tokens):
+    parser = EarleyParser(tokens)
+    tree = parser.parse()
+    assert tree == StackParser(tokens).parse()
+    return parser.chartItems
+
+
+def test_right_recursive_statements_parse_in_linear_time():
+    small, large = ("".join(f"print({index})\n" for index in range(count)) for count in (250, 1000))
+    small, large = Tokenizer(small).tokenize_store(), Tokenizer(large).tokenize_store()
+
+    # four times the statements, sixteen times the items when quadratic
+    assert chart_items(large) < 5 * chart_items(small)
+
+
+def test_functions_parse_in_linear_time():
+    small, large = (Tokenizer(generate_program("functions", size)).tokenize_store() for size in (25, 100))
+
+    # every unit ends its chart, instead of the chart of the rest of the file
+    assert chart_items(large) < 5 * chart_items(small)
+
+
+def test_right_recursive_parameters_and_arguments_match_stack():
+    source = f"func f({', '.join(f'p{index}' for index in range(300))}) {{ print({' '.join(map(str, range(300)))}) }}"
+    tokens = Tokenizer(source).tokenize_store()
+
+    assert EarleyParser(tokens).parse() == StackParser(tokens).parse()
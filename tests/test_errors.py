@@ -0,0 +1,21 @@
+import pytest
+
+from tokenizer import Tokenizer
+from tokenParser import MyParser, ParseError
+
+
+class EarleyParser(MyParser, engine="earley"):
+    pass
+
+
+class StackParser(MyParser, engine="stack"):
+    pass
+
+
+@pytest.mark.parametrize("parserClass", [MyParser, EarleyParser, StackParser])
+def test_operators_are_expected_where_a_chain_stops(parserClass):
+    with pytest.raises(ParseError) as error:
+        parserClass(Tokenizer("x = 3").tokenize_store()).parse()
+
+    assert error.value.index == 1
+    assert "'*'" in error.value.expected and "'+'" in error.value.expected
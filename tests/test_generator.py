@@ -0,0 +1,87 @@
+import contextlib
+import io
+
+import pytest
+
+from tokenizer import Tokenizer
+from tokenParser import MyParser
+from generator import Generator, SymbolTable
+from optimizer import optimize
+from astgenerator import AstGenerator
+
+
+def parse(source):
+    return MyParser(Tokenizer(source).tokenize_store()).parse()
+
+
+def run(code):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        exec(code, {})
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("level", [0, 1, 2])
+def test_long_chain_of_operations_generates(level):
+    tree = optimize(parse("func f(a) { var y = " + " + ".join(["a"] * 500) + " print(y) } f(2)"), level)
+
+    assert run(Generator(tree).generate()) == run(AstGenerator(tree).compile()) == "1000\n"
+
+
+@pytest.mark.parametrize("level", [0, 1, 2])
+def test_let_runs_the_same_at_every_level(level):
+    tree = optimize(parse("func f(a) { let k = 3 var y = k * a print(y k) } func g() { let u = 1 } f(2)"), level)
+
+    assert run(Generator(tree).generate()) == run(AstGenerator(tree).compile()) == "6 3\n"
+
+
+def test_operations_keep_their_grouping():
+    tree = parse("var a = 2 print((a + 1) * (2 + a) + (a + (1 + a)) * a * (a * a))")
+
+    assert "(a + 1) * (2 + a) + (a + (1 + a)) * a * (a * a)" in Generator(tree).generate()
+
+
+NESTED = """func f(a) {
+    let k = 2
+    func g(b) {
+        func h(c) {
+            print(a + b * c k)
+        }
+        h(b)
+    }
+    g(a)
+}
+func e() { }
+f(1)
+"""
+
+
+def test_streamed_code_is_the_generated_code():
+    tree = parse(NESTED)
+    stream = io.StringIO()
+    Generator(tree).generate_to(stream)
+
+    assert stream.getvalue() == Generator(tree).generate()
+    assert run(stream.getvalue()) == "2 2\n"
+
+
+def test_parameters_are_not_visible_after_their_function():
+    assert run(Generator(parse("func f(a) { print(a) } f(1)")).generate()) == "1\n"
+
+    with pytest.raises(AssertionError, match="variable a is not defined"):
+        Generator(parse("func f(a) { print(a) } print(a)")).generate()
+    with pytest.raises(AssertionError, match="variable b is not defined"):
+        Generator(parse("func f(a) { func g(b) { print(b) } print(b) }")).generate()
+
+
+def test_inner_definitions_cover_outer_ones_until_their_scope_closes():
+    symbols = SymbolTable()
+    symbols.define("x", "static")
+    symbols.push()
+    symbols.define("x", "let")
+    symbols.define("y")
+
+    assert (symbols.lookup("x"), symbols.lookup("y")) == ("let", "dynamic")
+
+    symbols.pop()
+    assert (symbols.lookup("x"), symbols.lookup("y")) == ("static", None)
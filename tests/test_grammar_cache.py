@@ -0,0 +1,9 @@
+import tokenParser
+from tokenParser import MyParser
+
+
+def test_key_changes_with_the_compiler_source(monkeypatch):
+    key = MyParser._grammarKey({}, True)
+
+    monkeypatch.setattr(tokenParser, "_compilerHash", lambda: "edited")
+    assert MyParser._grammarKey({}, True) != key
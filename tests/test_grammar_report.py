@@ -0,0 +1,15 @@
+from tokenParser import MyParser, _lookaheadOverlap
+
+
+def test_terminal_overlaps_the_type_it_is_tokenized_as():
+    assert _lookaheadOverlap({("value", "func")}, {("type", "identifier")}) == {("value", "func")}
+    assert _lookaheadOverlap({("value", "(")}, {("type", "identifier")}) == set()
+    assert _lookaheadOverlap({("value", "(")}, {("value", "(")}) == {("value", "(")}
+
+
+def test_keyword_alternatives_need_backtracking():
+    report = MyParser.grammar_report()
+    backtracking = report.split("needs backtracking:", 1)[1]
+
+    assert "'function_declaration' / 'call' on 'func'" in backtracking
+    assert "'assignment' / 'call' on 'let', 'var'" in backtracking
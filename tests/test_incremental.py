@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from benchmarks.corpus import generate_program
+from incremental import IncrementalParser
+from tokenizer import Tokenizer
+from tokenParser import MyParser, ParseError
+
+
+def parsed(source):
+    """
+    the tree of source parsed whole, or the index of its error
+    """
+    try:
+        return MyParser(Tokenizer(source).tokenize()).parse()
+    except ParseError as error:
+        return error.index
+
+
+def edited(parser, offset, deleted, inserted):
+    try:
+        return parser.edit(offset, deleted, inserted)
+    except ParseError as error:
+        return error.index
+
+
+def test_random_edits_give_the_tree_of_a_full_parse():
+    rng = random.Random(0)
+    pieces = ["print(x)", "func g(a) { print(a) }", "}", "{", " ", "\n", "x", "1", "+", "let y = 2", "(", ")", ""]
+
+    for seed in range(12):
+        parser = IncrementalParser(generate_program(rng.choice(["functions", "statements", "parameters"]), 3, seed))
+        for _ in range(20):
+            offset = rng.randint(0, len(parser.source))
+            deleted = rng.randint(0, min(8, len(parser.source) - offset))
+            inserted = rng.choice(pieces)
+            expected = parsed(parser.source[:offset] + inserted + parser.source[offset + deleted:])
+
+            assert edited(parser, offset, deleted, inserted) == expected
+
+
+def test_edits_inside_across_and_merging_units():
+    source = "func f(a) {\n    print(a)\n}\nfunc g(b) {\n    print(b + 1)\n}\nf(1)\ng(2)\n"
+    parser = IncrementalParser(source)
+
+    # inside the second unit
+    offset = parser.source.index("b + 1")
+    assert parser.edit(offset, 1, "b * 2") == parsed(parser.source)
+
+    # from inside the first unit into the second one
+    offset = parser.source.index("print(a)")
+    assert parser.edit(offset, parser.source.index("print(b") - offset, "") == parsed(parser.source)
+
+    # the whitespace between two tokens, which become one
+    parser = IncrementalParser("let x = 1\nprint(x)\nlet y = 2 3\n")
+    offset = parser.source.index("2 3") + 1
+    assert edited(parser, offset, 1, "") == parsed(parser.source)
+    assert "23" in parser.source
+
+
+def test_edit_after_an_error_recovers():
+    parser = IncrementalParser("func f(a) {\n    print(a)\n}\nf(1)\n")
+
+    offset = parser.source.index("print")
+    with pytest.raises(ParseError):
+        parser.edit(offset, 0, "= ")
+    assert parser.tree is None
+
+    assert parser.edit(offset, 2, "") == parsed(parser.source)
+    assert parser.edit(offset, 0, "print(2)\n    ") == parsed(parser.source)
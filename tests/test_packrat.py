@@ -0,0 +1,29 @@
+import pytest
+
+from benchmarks.corpus import generate_program
+from tokenizer import Tokenizer
+from tokenParser import MyParser, ParseError
+
+
+class StackParser(MyParser, engine="stack"):
+    pass
+
+
+@pytest.mark.parametrize("parserClass", [MyParser, StackParser])
+@pytest.mark.parametrize("memoSize", [1, 8, 100000])
+def test_packrat_gives_the_tree_without_it(parserClass, memoSize):
+    for shape in ("functions", "expressions", "parameters"):
+        tokens = Tokenizer(generate_program(shape, 4)).tokenize_store()
+
+        assert parserClass(tokens, packrat=True, memoSize=memoSize).parse() == parserClass(tokens).parse()
+
+
+@pytest.mark.parametrize("memoSize", [1, 8])
+def test_packrat_raises_the_error_without_it(memoSize):
+    tokens = Tokenizer("func f(a) {\n    print(a + (1 * )\n}\n").tokenize_store()
+
+    with pytest.raises(ParseError) as expected:
+        MyParser(tokens).parse()
+    with pytest.raises(ParseError) as error:
+        MyParser(tokens, packrat=True, memoSize=memoSize).parse()
+    assert (error.value.index, error.value.expected) == (expected.value.index, expected.value.expected)
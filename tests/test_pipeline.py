@@ -0,0 +1,22 @@
+from tokenizer import Tokenizer
+from tokenParser import MyParser
+from pipeline import parse_units
+
+
+class CountingParser(MyParser):
+    parses = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        CountingParser.parses += 1
+
+
+def test_unit_spanning_many_blocks_is_reparsed_logarithmically():
+    source = "print(1)\n" + "".join(f"func f{index}(a) {{\n    print(a)\n}}\n" for index in range(64))
+    tokens = Tokenizer(source).tokenize()
+
+    CountingParser.parses = 0
+    assert list(parse_units(iter(tokens), CountingParser)) == MyParser(tokens).parse()
+
+    # one window per doubling, not one per block
+    assert CountingParser.parses <= 16
@@ -0,0 +1,53 @@
+from tokenizer import Tokenizer
+from tokenParser import Parser, _
+
+
+class Brackets(Parser):
+    def parse(self):
+        tree = []
+        while self.executeIndex < len(self.tokens):
+            tree.append(self.parse_round())
+        return tree
+
+    @_("start : ( identifier )")
+    def parse_round(self, name):
+        return ("round", name)
+
+    @_("start : [ identifier ]")
+    def parse_square(self, name):
+        return ("square", name)
+
+    @_("identifier : _")
+    def parse_identifier(self, value):
+        return value
+
+
+class TunedBrackets(Brackets, profile={"version": 1, "rules": {"start": {"[ identifier ]": 5}}}):
+    pass
+
+
+class TunedStackBrackets(Brackets, engine="stack", profile={"version": 1, "rules": {"start": {"[ identifier ]": 5}}}):
+    pass
+
+
+def test_profile_moves_the_likely_alternative_first():
+    assert [alternative.pattern for alternative in TunedBrackets._rules["start"]] == ["[ identifier ]", "( identifier )"]
+
+
+def test_entry_keeps_every_alternative_it_tried_before():
+    tokens = Tokenizer("( a ) [ b ]").tokenize()
+    expected = [("round", "a"), ("square", "b")]
+
+    assert Brackets(tokens).parse() == expected
+    assert TunedBrackets(tokens).parse() == expected
+    assert TunedStackBrackets(tokens).parse() == expected
+
+
+def test_later_entry_still_skips_earlier_alternatives():
+    parser = TunedBrackets(Tokenizer("( a )").tokenize())
+    try:
+        parser.parse_square()
+    except Exception as error:
+        assert "'['" in str(error)
+    else:
+        raise AssertionError("parse_square matched an alternative written before it")
@@ -0,0 +1,62 @@
+import io
+import mmap
+
+import tokenizer
+from tokenizer import Tokenizer
+from tokenParser import Parser, _
+
+
+def test_program_values_are_not_interned():
+    before = len(tokenizer._value_strings)
+    store = Tokenizer(" ".join(f"name{index} = {index}" for index in range(100))).tokenize_store()
+
+    assert len(tokenizer._value_strings) == before
+    assert store.value(0) == "name0" and store.value(2) == "0"
+
+
+class Flags(Parser):
+    def parse(self):
+        return self.parse_flag()
+
+    @_("flag : set true")
+    def parse_flag(self):
+        return True
+
+    @_("flag : set false")
+    def parse_flag2(self):
+        return False
+
+
+def test_literal_terminal_matches():
+    assert Flags(Tokenizer("set true").tokenize_store()).parse() is True
+    assert Flags(Tokenizer("set false").tokenize()).parse() is False
+
+
+def test_store_coded_before_the_grammar_is_recoded():
+    store = Tokenizer("clear false").tokenize_store()
+
+    class Clear(Parser):
+        def parse(self):
+            return self.parse_clear()
+
+        @_("reset : clear false")
+        def parse_clear(self):
+            return "cleared"
+
+    assert Clear(store).parse() == "cleared"
+
+
+SOURCE = 'print("héllo wörld ✓ 𝄞")\nlet é = "ü"\nfunc f(a) {\n    print(a + "日本")\n}\n'
+
+
+def test_chunks_split_inside_tokens_and_characters(tmp_path):
+    expected = Tokenizer(SOURCE).tokenize()
+    path = tmp_path / "program.swft"
+    path.write_bytes(SOURCE.encode("utf-8"))
+
+    assert list(Tokenizer.iter_tokens(io.StringIO(SOURCE), chunk_size=1)) == expected
+    assert list(Tokenizer.iter_tokens(io.BytesIO(SOURCE.encode("utf-8")), chunk_size=1)) == expected
+    assert list(Tokenizer.iter_tokens(str(path), chunk_size=1)) == expected
+
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        assert list(Tokenizer.iter_tokens(mapped, chunk_size=1)) == expected
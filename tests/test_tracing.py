@@ -0,0 +1,32 @@
+import sys
+
+from benchmarks.corpus import generate_program
+from tokenizer import Tokenizer
+from tokenParser import MyParser
+from tracing import Tracer
+
+
+class StackParser(MyParser, engine="stack"):
+    pass
+
+
+def counts(tracer):
+    return {name: (stats.calls, stats.successes, stats.failures, stats.backtracked) for name, stats in tracer.rules.items()}
+
+
+def test_stack_engine_is_traced_like_descent():
+    source = generate_program("functions", 10)
+    descent, stack = Tracer(), Tracer()
+
+    assert descent.install(MyParser(Tokenizer(source).tokenize_store())).parse() == \
+        stack.install(StackParser(Tokenizer(source).tokenize_store())).parse()
+    assert counts(stack) == counts(descent)
+    assert stack.alternatives == descent.alternatives
+
+
+def test_deep_program_is_traced_within_the_recursion_limit():
+    source = "func f() {\n" + "print(1)\n" * (2 * sys.getrecursionlimit()) + "}\n"
+    tracer = Tracer()
+
+    tracer.install(StackParser(Tokenizer(source).tokenize_store())).parse()
+    assert tracer.rules["statements"].calls > 2 * sys.getrecursionlimit()
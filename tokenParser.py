@@ -1,13 +1,192 @@
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 import inspect
 import functools
+import hashlib
+import io
+import json
+import marshal
+import os
+import pickle
 import re
+import sys
 from pprint import pprint
-import textwrap
+from types import MappingProxyType, FunctionType, CodeType
+from tokenizer import TokenStore, TokenType, compile_token_types, intern_type, intern_value
 
 
 class ParseError(Exception):
-    pass
+    def __init__(self, message, index=None, expected=()):
+        super().__init__(message)
+        self.index = index
+        self.expected = tuple(expected)
+
+
+class _Failure:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "Error"
+
+
+# returned by a rule when none of its alternatives match
+Error = _Failure()
+_Pending = object()
+
+# kinds of symbols in a compiled pattern, see the docs of _
+ENDPOINT, ARGUMENTLESS, METHOD, SPLICE, TERMINAL, PRECEDENCE, OPERATOR = range(7)
+
+# terminals of this type are kept as arguments
+_OPERATOR_TYPE = intern_type("operator")
+
+Alternative = namedtuple("Alternative", ("name", "pattern", "symbols", "arguments", "handler", "method",
+                                         "firstTypes", "firstValues", "nullable"))
+
+
+def _first_of(symbols, first):
+    """
+    FIRST set of a sequence of compiled symbols
+
+    returns the token types and token values the sequence can start with
+    and whether it can match without consuming any token,
+    first holds the same triple for every rule
+    """
+    types, values = set(), set()
+
+    for kind, parameter in symbols:
+        if kind is ENDPOINT:
+            types.add(parameter)
+            return types, values, False
+
+        elif kind is TERMINAL or kind is OPERATOR:
+            values.add(parameter)
+            return types, values, False
+
+        elif kind is ARGUMENTLESS:
+            return types, values, True
+
+        else:
+            ruleTypes, ruleValues, nullable = first[parameter]
+            types |= ruleTypes
+            values |= ruleValues
+            if not nullable:
+                return types, values, False
+
+    return types, values, True
+
+
+@functools.lru_cache(maxsize=1)
+def _defaultTokenTypes():
+    return compile_token_types(TokenType())
+
+
+@functools.lru_cache(maxsize=None)
+def _terminalType(value):
+    """
+    the token type the default TokenType tokenizes a terminal as,
+    None when it is not one token of it
+    """
+    match = _defaultTokenTypes().match(value)
+    return match.lastgroup if match is not None and match.group() == value else None
+
+
+def _lookaheadOverlap(left, right):
+    """
+    the tokens of left and right which can be the same token, both are
+    sets of ("type", tokenType) and ("value", value) like FIRST sets
+
+    a value can be a token of the type its terminal is tokenized as,
+    or of any type when the terminal is not one token
+    """
+    overlap = left & right
+    for one, other in ((left, right), (right, left)):
+        types = {key for kind, key in other if kind == "type"}
+        if not types:
+            continue
+        for kind, key in one:
+            if kind == "value" and (_terminalType(key) in types or _terminalType(key) is None):
+                overlap.add((kind, key))
+    return overlap
+
+
+def _passthrough(self, value):
+    return value
+
+
+# bump when the compiled rule tables change shape
+_GRAMMAR_CACHE_VERSION = 1
+
+# class attributes written by _compileRules
+_COMPILED_ATTRIBUTES = ("_rules", "_entries", "_first", "_follow", "_operators", "_earley")
+
+
+@functools.lru_cache(maxsize=1)
+def _compilerHash():
+    """
+    hash of the source of this module, the rules are compiled by it
+    so any edit to it can change the tables in the grammar cache
+    """
+    path = globals().get("__file__")
+    if path is None:
+        return None
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _fingerprint(code):
+    """
+    the parts of a code object which decide what it does,
+    marshal output depends on reference counts and set order
+    on hash seeds, so neither can be hashed directly
+    """
+    consts = []
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            consts.append(_fingerprint(const))
+        elif isinstance(const, frozenset):
+            consts.append(sorted(map(repr, const)))
+        else:
+            consts.append(repr(const))
+    return code.co_code, consts, code.co_names, code.co_varnames
+
+
+def _copyFunction(func):
+    """
+    a new function object with the code, globals and closure of func,
+    so it can be decorated again without touching func
+    """
+    copied = FunctionType(func.__code__, func.__globals__, func.__name__, func.__defaults__, func.__closure__)
+    copied.__kwdefaults__ = func.__kwdefaults__
+    copied.__qualname__ = func.__qualname__
+    return copied
+
+
+class _GrammarPickler(pickle.Pickler):
+    """
+    pickles compiled rule tables, decorated methods and their handlers
+    are stored as references to their place in the rule lists
+    """
+
+    def __init__(self, file, functions):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.references = {id(function): reference for reference, function in functions.items()}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, MappingProxyType):
+            return ("mapping", dict(obj))
+        if isinstance(obj, FunctionType):
+            return self.references.get(id(obj))
+        return None
+
+
+class _GrammarUnpickler(pickle.Unpickler):
+    def __init__(self, file, functions):
+        super().__init__(file)
+        self.functions = functions
+
+    def persistent_load(self, pid):
+        if pid[0] == "mapping":
+            return MappingProxyType(pid[1])
+        return self.functions[pid]
 
 
 class _:
@@ -41,14 +220,17 @@ class _:
             tries to call decorator with function_name of "parameter_list"
             looks for Node ')'
 
-        if the Node was not found or the call failed a ParseError will be thrown
-
-        when ParseError occured the decorator tries to call
+        if the Node was not found or the call failed the decorator tries to call
         to alternative function instead; in example2 that would be "parameter_clause : ( )"
 
-        if all alternatives fail, return 'Error' to the function above
+        if all alternatives fail, return Error to the function above
         this is necessary because all of the decorator's work is done recursively
 
+        failures are only remembered as the farthest token index any
+        alternative reached and the symbols expected there, when the
+        decorator called as a starting node fails a ParseError
+        describing them is thrown
+
     types of parameters recognised:
         endpoint:
             used for Tokens such as identifier or literal
@@ -69,6 +251,26 @@ class _:
 
             marked with 'autoedit' example @_("term : autoedit")
 
+        precedence:
+            parses a chain of operands separated by the operators
+            listed in the precedence attribute of the Parser,
+            the operands are parsed with the rule after 'precedence'
+
+            precedence lists (associativity, operator, ...) groups,
+            each binding tighter than the one before, associativity
+            is "left" or "right"
+
+            the function is called with (left operand, operator, right operand)
+            for every operator, in order of binding power, and the rule
+            returns the value of the last call
+
+            marked with 'precedence' example:
+                precedence = (("left", "+", "-"), ("left", "*"))
+
+                @_("expr : precedence factor")
+                def parse_binary(self, left, operator, right):
+                    return BinaryOperationNode(left, operator, right)
+
         method:
             redirects to some other decorator with function_name
             in example1 function will eventually call the function
@@ -104,180 +306,110 @@ class _:
 
         @functools.wraps(func)
         def wrapper(self, *args, level=0, debug=False, ** kwargs):
-            parameters = func.parameters
-
-            arguments_data = []
-            arguments = inspect.getargspec(func).args[1:]
-            funcName = parameters.split(" : ", 1)[0]
-            startingPosition = self.executeIndex
-
-            # getAlternatives(parameters, funcName)
-            expectedPattern = parameters.split(" : ", 1)[1]
-            alternatives = list(zip(self._get_patterns(funcName), self._get_methods(funcName)))
-            expectedPatternIndex = list(map(lambda alt: alt[0], alternatives)).index(expectedPattern)
-            alternatives = [method for pattern, method in alternatives[expectedPatternIndex + 1:]]
-
-            params = expectedPattern.split()
-
-            try:
-                for parameter in params:
-
-                    # parseEndpoint(parameter)
-                    #
-                    # endpoint is a function with just value
-                    # such as identifier or literal
-                    #
-                    if parameter == "_":
-                        if self._peek(expected_type=funcName, peekIndex=self.executeIndex):
-                            retval = self._consume(expected_type=funcName, consumeIndex=self.executeIndex)
-                            retval = func(self, retval)
-                            arguments_data.append(retval)
-
-                            if debug:
-                                print(" " * (level * 4), f"{func.__name__} > parsing endpoint {funcName} with value {retval}")
-
-                            return retval
-                        else:
-                            raise ParseError(f"endpoint: invalid pattern, got '{self._peek(peekIndex=self.executeIndex)}' expected '{parameter}'")
-
-                    # parseArgumentless(parameter)
-                    #
-                    # functuion which does not take any
-                    # arguemnts, just self
-                    #
-                    elif parameter == ".":
-
-                        if debug:
-                            print(" " * (level * 4), f"{func.__name__} > calling argumentless function {func.__name__}")
-
-                        newkwargs = {key: value for key, value in zip(arguments, arguments_data)}
-                        kwargs = {**newkwargs, **kwargs}
-                        return func(self, *args, **kwargs)
-
-                    # parseAutoedit(parameter)
-                    #
-                    # function which was edited by leftRecursionErrorHandler
-                    #
-                    elif parameter == "autoedit":
+            funcName, index = self._entries[func.parameters]
 
-                        autoedit = list(filter(lambda fn: fn.__name__ == f"parse_{funcName}_autoedit", self._get_methods(funcName)))[0]
+            # failures before the starting index belong to earlier calls
+            if self._farthest < self.executeIndex:
+                self._farthest, self._expected = -1, set()
 
-                        if debug:
-                            print(" " * (level * 4), f"{func.__name__} > parsing autoedit {autoedit.__name__}")
-
-                        parsed = autoedit(self, level=level + 1, debug=debug)
-
-                        if parsed is 'Error':
-                            raise ParseError(f"autoedit: recieved error")
-
-                        if debug:
-                            print(" " * (level * 4), f"{func.__name__} > autoedit returned {parsed}, now at index {self.executeIndex}")
-
-                        arguments_data += parsed
-
-                    # parseRecursive(parameter)
-                    #
-                    # if parameter is a function reference
-                    # call that reference
-                    #
-                    elif self._is_method_avalable(parameter):
-
-                        if debug:
-                            print(" " * (level * 4), f"{func.__name__} > parsing callable {parameter}")
+            retval = self._parseEntry(funcName, index, level, debug, args, kwargs)
+            if retval is Error:
+                raise self._parseError()
+            return retval
+        return wrapper
 
-                        parsed = self._tryParsing(parameter, level, debug=debug)
 
-                        if parsed is 'Error':
-                            raise ParseError(f"callable: recieved error")
+class Parser:
+    tokens = []
+    _decorated_methods = []
+    _source_rules = []
 
-                        if debug:
-                            print(" " * (level * 4), f"{func.__name__} > callable returned {parsed}, now at index {self.executeIndex}")
+    _engine = "descent"
+    _profile = None
 
-                        if parameter.endswith("_autoedit"):
-                            arguments_data += parsed
-                        else:
-                            arguments_data.append(parsed)
-
-                    # parseOperator(parameter)
-                    #
-                    #
-                    elif self._peek(expected_type="operator", peekIndex=self.executeIndex):
-                        if self._peek(expected_value=parameter, peekIndex=self.executeIndex):
-                            op = self._consume(expected_type="operator", expected_value=parameter, consumeIndex=self.executeIndex)
-                            arguments_data.append(op)
-
-                            if debug:
-                                print(" " * (level * 4), f"{func.__name__} > consumed operator {parameter}")
-                        else:
-                            raise ParseError(f"got wrong operator, expected {self._peek(peekIndex=self.executeIndex).value} but got {parameter}")
+    # told what the stack engine does, see _parseStack
+    _trace = None
+    _rules = MappingProxyType({})
+    _entries = MappingProxyType({})
+    _entryOrders = MappingProxyType({})
+    _operators = MappingProxyType({})
 
-                    # parseIgnorableChar(parameter)
-                    #
-                    # ignore any non alphabetic or non numerical character
-                    # except operators and others specified above
-                    #
-                    else:
-                        if self._peek(expected_value=parameter, peekIndex=self.executeIndex):
-                            if debug:
-                                print(" " * (level * 4), f"{func.__name__} > parsing ignorable {parameter}")
-
-                            self._consume(expected_value=parameter, consumeIndex=self.executeIndex)
+    def __init__(self, tokens, packrat=False, memoSize=100000):
+        """
+        tokens is a TokenStore or a list of Token, which is
+        turned into one, the engines compare integer codes only
+        """
+        if not isinstance(tokens, TokenStore):
+            tokens = TokenStore.fromTokens(tokens)
 
-                        else:
-                            raise ParseError(f"ignorable: invalid pattern, got '{self._peek(peekIndex=self.executeIndex)}' expected '{parameter}'")
+        self.tokens = tokens
+        self.executeIndex = 0
 
-            except ParseError as e:
-                if debug:
-                    print(" " * (level * 4), f"[!] {func.__name__} > recieved ParseError", e)
-                    print(" " * (level * 4), f"[!] {func.__name__} > backtracking from {self.executeIndex} to {startingPosition}")
+        self._rules, self._operators, self._earley = self._codedRules()
+        tokens.refresh()
 
-                self.executeIndex = startingPosition
+        self._types = tokens.types
+        self._values = tokens.codes
+        self._strings = tokens.strings
 
-                # tryAlternative(alternatives)
-                #
-                # before returning error
-                # try other alternative patterns
-                #
-                if len(alternatives) != 0:
-                    if debug:
-                        print("-" * 10)
-                        print(" " * (level * 4), f"{func.__name__} > Switching to alternative")
-                        print(" " * (level * 4), f"{func.__name__} > at index {self.executeIndex}")
+        self.memo = OrderedDict() if packrat else None
+        self.memoSize = memoSize
 
-                    altretval = alternatives[0](self, level=level, debug=debug)
-                    # altretval = alternative(self, level=level, debug=debug)
+        self._farthest = -1
+        self._expected = set()
 
-                    return altretval
+        # items the earley engine put in its charts, its work in a
+        # measure that does not depend on the machine
+        self.chartItems = 0
 
-                return 'Error'
+    def parse(self):
+        tree = []
+        # while len(self.tokens) != 0:
+        tree.append(self.parse_start_of_file())
+        return tree
 
-            newkwargs = {key: value for key, value in zip(arguments, arguments_data)}
-            kwargs = {**newkwargs, **kwargs}
-            retval = func(self, *args, **kwargs)
+    def __init_subclass__(cls, shouldHandleLeftRecursion=True, engine=None, cacheGrammar=True, profile=None, **kwargs):
+        super().__init_subclass__(**kwargs)
 
-            if debug:
-                print(" " * (level * 4), f"{func.__name__} > function {func.__name__} returned {retval}")
+        # rules are inherited, but a subclass must not add its own to the parent
+        cls._decorated_methods = list(cls._decorated_methods)
+        cls._source_rules = list(cls._source_rules)
 
-            return retval
-        return wrapper
+        """
+        engine selects how the rules are executed, it is inherited
 
+            "descent"   recursive descent with backtracking (default)
+            "earley"    chart parser built from the rules as written,
+                        handles left recursion without rewriting them
+            "stack"     the same descent run by a loop over an explicit
+                        stack, nesting is not limited by the recursion limit
 
-class Parser:
-    tokens = []
-    _decorated_methods = []
+        example:
+            class MyEarleyParser(MyParser, engine="earley"):
+                pass
+        """
+        if engine is not None:
+            if engine not in ("descent", "earley", "stack"):
+                raise ValueError(f"unknown parser engine {engine}, expected 'descent', 'earley' or 'stack'")
+            cls._engine = engine
 
-    def __init__(self, tokens):
-        self.tokens = tokens
-        self.executeIndex = 0
+        """
+        profile holds how often each alternative matched, as written by
+        Tracer.write_profile, or the path of such a file, it is inherited
 
-    def parse(self):
-        tree = []
-        # while len(self.tokens) != 0:
-        tree.append(self.parse_start_of_file())
-        return tree
+        the alternatives of every rule are then tried most matched first
+        wherever the grammar proves that cannot change the tree,
+        see _reorderAlternatives, the earley engine ignores it
 
-    def __init_subclass__(cls, shouldHandleLeftRecursion=True, **kwargs):
-        super().__init_subclass__(**kwargs)
+        example:
+            class MyTunedParser(MyParser, profile="swft.profile.json"):
+                pass
+        """
+        if profile is not None:
+            if isinstance(profile, str):
+                with open(profile) as file:
+                    profile = json.load(file)
+            cls._profile = profile
 
         """
         if Parser shouldHandleLeftRecursion then
@@ -296,36 +428,34 @@ class Parser:
 
         def defineNewFunction(newFuncName, newExpectedPattern, origFunc=None):
             #
-            # prepareArguments(newExpectedPattern)
+            # prepareExecutableFunction(newExpectedPattern)
+            #
+            # rules moved by the left recursion fix keep their function,
+            # the new rules flatten everything they parsed into one list
             #
             if origFunc is None:
                 arg_names = newExpectedPattern.split(' : ', 1)[1].split()
                 arg_names = list(map(lambda arg: arg.replace('\'', ''), arg_names))
                 arg_names = list(map(lambda arg: re.sub("[\+\-\*\/]", "op", arg), arg_names))
                 arg_names = ", ".join(arg_names)
-            else:
-                arg_names = inspect.getargspec(origFunc.__wrapped__).args[1:]
-                arg_names = ", ".join(arg_names)
-
-            #
-            # prepareExecutableFunction()
-            #
-            to_exec = ""
-            to_exec += f"@_(\"{newExpectedPattern}\")\n"
 
-            if origFunc is None:
+                to_exec = ""
                 to_exec += f"def {newFuncName}(self, {arg_names}):\n"
                 to_exec += f"    return [item for val in ({arg_names},) for item in (val if type(val) in (list, tuple) else [val])]\n"
 
-            else:
-                to_exec += '\n'.join(textwrap.dedent(inspect.getsource(origFunc)).split('\n')[1:])
+                namespace = {}
+                exec(to_exec, globals(), namespace)
+                func = namespace[newFuncName]
+                generated.append(("code", newFuncName, newExpectedPattern, marshal.dumps(func.__code__)))
 
-            exec(to_exec)
+            else:
+                func = _copyFunction(origFunc.__wrapped__)
+                generated.append(("copy", newFuncName, newExpectedPattern))
 
             #
             # addFunctionToParser()
             #
-            funcObj = locals()[newFuncName]
+            funcObj = _(newExpectedPattern)(func)
             funcName, expectedPattern = funcObj.parameters.split(' : ', 1)
 
             setattr(cls, newFuncName, funcObj)
@@ -368,7 +498,7 @@ class Parser:
         #
         parseFunctions = {key: value
                           for key, value in cls.__dict__.items()
-                          if not key.startswith("__") and key != 'parse'}
+                          if hasattr(value, 'parameters')}
 
         #
         # getAvalablePatterns(parseFunctions)
@@ -376,6 +506,38 @@ class Parser:
         allPatterns = [func.parameters
                        for func in parseFunctions.values()]
 
+        for origName, funcObj in parseFunctions.items():
+            funcName, expectedPattern = funcObj.parameters.split(' : ', 1)
+            cls._source_rules.append((funcName, expectedPattern, funcObj))
+
+        # methods a descent parent rewrote are called by their rule as written
+        if cls._engine == "earley":
+            written = {funcObj.__name__: funcObj for funcName, expectedPattern, funcObj in cls._source_rules}
+            for name, funcObj in written.items():
+                if name not in parseFunctions:
+                    setattr(cls, name, funcObj)
+
+        """
+        if Parser cacheGrammar then the rewritten rules and the compiled
+        rule tables are pickled into __pycache__ next to the module of
+        the class, later imports load them instead of fixing left
+        recursion and compiling the rules again
+
+        the cache is keyed by a hash of every rule string, the code of
+        its function, the engine, the precedence and the source of this
+        module, so editing any of them recompiles the grammar
+        """
+        cachePath = cls._grammarCachePath() if cacheGrammar else None
+        if cachePath is not None:
+            cacheKey = cls._grammarKey(parseFunctions, shouldHandleLeftRecursion)
+            if cls._loadGrammar(cachePath, cacheKey, parseFunctions):
+                cls._reorderAlternatives()
+                cls._codedRules()
+                return
+
+        # every rule added to _decorated_methods, in order, for the cache
+        generated = []
+
         #
         # parseEachFunction(parseFunctions)
         #
@@ -386,7 +548,7 @@ class Parser:
             #
             # didLeftRecursionOccur(funcName, params)
             #
-            if funcName == params[0] and shouldHandleLeftRecursion:
+            if funcName == params[0] and shouldHandleLeftRecursion and cls._engine != "earley":
                 delattr(cls, origName)
                 defineNewFunction(origName, f"{funcName} : {funcName}_autoedit", funcObj)
 
@@ -395,51 +557,1342 @@ class Parser:
                 fixLeftRecursion(funcName, otherPatterns)
             else:
                 cls._decorated_methods.append((funcName, expectedPattern, funcObj))
+                generated.append(("class", origName))
+
+        cls._compileRules()
+
+        if cachePath is not None:
+            cls._storeGrammar(cachePath, cacheKey, generated)
+
+        cls._reorderAlternatives()
+        cls._codedRules()
+
+    @classmethod
+    def _grammarCachePath(cls):
+        """
+        __pycache__/<module>.<class>.<interpreter>.grammar next to the
+        module of the class, None when the module has no file
+        """
+        module = sys.modules.get(cls.__module__)
+        path = getattr(module, "__file__", None)
+        if path is None or cls.__module__ == "__main__" or "<locals>" in cls.__qualname__:
+            return None
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(os.path.dirname(os.path.abspath(path)), "__pycache__",
+                            f"{name}.{cls.__qualname__}.{sys.implementation.cache_tag}.grammar")
+
+    @classmethod
+    def _grammarKey(cls, parseFunctions, shouldHandleLeftRecursion):
+        parts = [_GRAMMAR_CACHE_VERSION, _compilerHash(), cls._engine, shouldHandleLeftRecursion,
+                 repr(getattr(cls, "precedence", ()))]
+
+        for methods in (cls._decorated_methods, cls._source_rules):
+            parts.append([(funcName, expectedPattern, _fingerprint(funcObj.__wrapped__.__code__))
+                          for funcName, expectedPattern, funcObj in methods])
+
+        parts.append([(origName, funcObj.parameters, _fingerprint(funcObj.__wrapped__.__code__))
+                      for origName, funcObj in parseFunctions.items()])
+
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    @staticmethod
+    def _grammarFunctions(decorated_methods, source_rules):
+        functions = {}
+        for listName, methods in (("decorated", decorated_methods), ("source", source_rules)):
+            for index, (funcName, expectedPattern, funcObj) in enumerate(methods):
+                functions[(listName, "method", index)] = funcObj
+                functions[(listName, "handler", index)] = funcObj.__wrapped__
+        return functions
+
+    @classmethod
+    def _storeGrammar(cls, path, key, generated):
+        state = {name: cls.__dict__[name] for name in _COMPILED_ATTRIBUTES if name in cls.__dict__}
+
+        try:
+            buffer = io.BytesIO()
+            _GrammarPickler(buffer, cls._grammarFunctions(cls._decorated_methods, cls._source_rules)).dump(state)
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as file:
+                pickle.dump((key, generated, buffer.getvalue()), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            pass
+
+    @classmethod
+    def _loadGrammar(cls, path, key, parseFunctions):
+        """
+        replay the rules added by the left recursion fix and install
+        the compiled tables, nothing is changed unless all of it loads
+        """
+        try:
+            with open(path, "rb") as file:
+                cachedKey, generated, state = pickle.load(file)
+            if cachedKey != key:
+                return False
+
+            methods, attributes = [], []
+            for spec in generated:
+                if spec[0] == "class":
+                    funcObj = parseFunctions[spec[1]]
+                else:
+                    if spec[0] == "copy":
+                        func = _copyFunction(parseFunctions[spec[1]].__wrapped__)
+                    else:
+                        func = FunctionType(marshal.loads(spec[3]), globals(), spec[1])
+                    funcObj = _(spec[2])(func)
+                    attributes.append((spec[1], funcObj))
+
+                funcName, expectedPattern = funcObj.parameters.split(' : ', 1)
+                methods.append((funcName, expectedPattern, funcObj))
+
+            decorated_methods = cls._decorated_methods + methods
+            functions = cls._grammarFunctions(decorated_methods, cls._source_rules)
+            state = _GrammarUnpickler(io.BytesIO(state), functions).load()
+
+        except Exception:
+            return False
+
+        for name, funcObj in attributes:
+            setattr(cls, name, funcObj)
+        cls._decorated_methods = decorated_methods
+        for name, value in state.items():
+            setattr(cls, name, value)
+
+        return True
+
+    @classmethod
+    def _compileRules(cls):
+        """
+        compile the grammar into an immutable rule table once per class
+
+        _rules maps every function_name to its alternatives in the order
+        they are tried, each alternative holds its pattern already split
+        into (kind, symbol) pairs, the argument names of its function
+        and the function itself
+
+        _entries maps the decorator argument of every method to its
+        function_name and index among the alternatives, so calling a
+        decorated method starts at that alternative
+
+        the earley engine compiles the rules as they were written,
+        without the left recursion rewrite
+        """
+        decorated_methods = cls._source_rules if cls._engine == "earley" else cls._decorated_methods
+
+        #
+        # compilePrecedence(cls.precedence)
+        #
+        # binding power grows with the position in precedence
+        #
+        levels = getattr(cls, "precedence", ())
+        operators = {}
+        for power, (associativity, *levelOperators) in enumerate(levels, start=1):
+            if associativity not in ("left", "right"):
+                raise ParseError(f"precedence associativity has to be 'left' or 'right', got {associativity}")
+            for operator in levelOperators:
+                operators[operator] = (power, associativity)
+        cls._operators = MappingProxyType(operators)
+
+        names = []
+        for funcName, expectedPattern, funcObj in decorated_methods:
+            if funcName not in names:
+                names.append(funcName)
+
+        rules = {}
+        entries = {}
+
+        for funcName in names:
+            methods = [method for method in decorated_methods if method[0] == funcName]
+            alternatives = []
+
+            for index, (funcName, expectedPattern, funcObj) in enumerate(cls._sortMethods(methods)):
+                handler = funcObj.__wrapped__
+                arguments = tuple(inspect.getfullargspec(handler).args[1:])
+
+                symbols = []
+                params = expectedPattern.split()
+                if params and params[0] == "precedence":
+                    params = []
+                    symbols.append((PRECEDENCE, expectedPattern.split()[1]))
+
+                for parameter in params:
+                    if parameter == "_":
+                        symbols.append((ENDPOINT, funcName))
+                    elif parameter == ".":
+                        symbols.append((ARGUMENTLESS, parameter))
+                    elif parameter == "autoedit":
+                        symbols.append((SPLICE, f"{funcName}_autoedit"))
+                    elif parameter in names:
+                        symbols.append((SPLICE if parameter.endswith("_autoedit") else METHOD, parameter))
+                    else:
+                        symbols.append((TERMINAL, parameter))
+
+                entries.setdefault(funcObj.parameters, (funcName, index))
+
+                #
+                # stratifyPrecedence(alternative)
+                #
+                # the earley engine gets one left or right recursive
+                # rule per binding power instead
+                #
+                if symbols and symbols[0][0] is PRECEDENCE and cls._engine == "earley":
+                    operand = symbols[0][1]
+                    for power, (associativity, *levelOperators) in enumerate(levels, start=1):
+                        current, tighter = f"{funcName}@{power}", f"{funcName}@{power + 1}" if power < len(levels) else operand
+                        stratified = []
+                        for operator in levelOperators:
+                            if associativity == "left":
+                                operation = ((METHOD, current), (OPERATOR, operator), (METHOD, tighter))
+                            else:
+                                operation = ((METHOD, tighter), (OPERATOR, operator), (METHOD, current))
+                            stratified.append(Alternative(current, " ".join(parameter for kind, parameter in operation), operation,
+                                                          arguments, handler, funcObj, frozenset(), frozenset(), True))
+                        stratified.append(Alternative(current, tighter, ((METHOD, tighter),), ("value",),
+                                                      _passthrough, funcObj, frozenset(), frozenset(), True))
+                        rules[current] = tuple(stratified)
+                    symbols = [(METHOD, f"{funcName}@1" if levels else operand)]
+                    arguments, handler = ("value",), _passthrough
+
+                alternatives.append(Alternative(funcName, expectedPattern, tuple(symbols), arguments, handler, funcObj,
+                                                frozenset(), frozenset(), True))
+
+            rules[funcName] = tuple(alternatives)
+
+        #
+        # computeFirstSets(rules)
+        #
+        # repeat until no set grows, rules may refer to each other
+        #
+        first = {funcName: (set(), set(), False) for funcName in rules}
+        changed = True
+        while changed:
+            changed = False
+            for funcName, alternatives in rules.items():
+                types, values, nullable = first[funcName]
+                for alternative in alternatives:
+                    altTypes, altValues, altNullable = _first_of(alternative.symbols, first)
+                    if not altTypes <= types or not altValues <= values or altNullable > nullable:
+                        types, values, nullable = types | altTypes, values | altValues, nullable or altNullable
+                        changed = True
+                first[funcName] = (types, values, nullable)
+
+        #
+        # computeFollowSets(rules)
+        #
+        # None stands for the end of tokens
+        #
+        follow = {funcName: set() for funcName in rules}
+        for funcName in rules:
+            if not any(parameter == funcName
+                       for alternatives in rules.values()
+                       for alternative in alternatives
+                       for kind, parameter in alternative.symbols if kind is METHOD or kind is SPLICE or kind is PRECEDENCE):
+                follow[funcName].add(None)
+
+        changed = True
+        while changed:
+            changed = False
+            for funcName, alternatives in rules.items():
+                for alternative in alternatives:
+                    for i, (kind, parameter) in enumerate(alternative.symbols):
+                        if kind is not METHOD and kind is not SPLICE and kind is not PRECEDENCE:
+                            continue
+                        types, values, nullable = _first_of(alternative.symbols[i + 1:], first)
+                        following = {("type", tokenType) for tokenType in types} | {("value", value) for value in values}
+                        if kind is PRECEDENCE:
+                            following |= {("value", operator) for operator in operators}
+                        if nullable:
+                            following |= follow[funcName]
+                        if not following <= follow[parameter]:
+                            follow[parameter] |= following
+                            changed = True
+
+        for funcName, alternatives in rules.items():
+            rules[funcName] = tuple(alternative._replace(firstTypes=frozenset(types), firstValues=frozenset(values), nullable=nullable)
+                                    for alternative in alternatives
+                                    for types, values, nullable in [_first_of(alternative.symbols, first)])
+
+        cls._rules = MappingProxyType(rules)
+        cls._entries = MappingProxyType(entries)
+        cls._first = MappingProxyType({funcName: (frozenset(types), frozenset(values), nullable)
+                                       for funcName, (types, values, nullable) in first.items()})
+        cls._follow = MappingProxyType({funcName: frozenset(following) for funcName, following in follow.items()})
+
+        #
+        # prepareEarley(rules)
+        #
+        # alternatives are numbered and cut after an endpoint
+        # or before an argumentless marker, which both end the match
+        #
+        if cls._engine == "earley":
+            alternatives, predictions = [], {}
+            for funcName, ruleAlternatives in cls._rules.items():
+                predictions[funcName] = []
+                for alternative in ruleAlternatives:
+                    symbols = []
+                    for kind, parameter in alternative.symbols:
+                        if kind is ARGUMENTLESS:
+                            break
+                        symbols.append((kind, parameter))
+                        if kind is ENDPOINT:
+                            break
+                    predictions[funcName].append(len(alternatives))
+                    alternatives.append(alternative._replace(symbols=tuple(symbols)))
+            cls._earley = (tuple(alternatives), MappingProxyType({funcName: tuple(ids) for funcName, ids in predictions.items()}))
+
+    @classmethod
+    def _reorderAlternatives(cls):
+        """
+        try the alternatives of every rule in the profile most matched first
+
+        the first alternative which matches is the value of a rule, so two
+        alternatives may only swap when they can never both match at the
+        same index, two alternatives are exclusive when walking their
+        symbols side by side reaches
+
+            a position where both take exactly one token and no token
+            can be both, say ':' against '='
+
+            or, after a shared prefix of the same symbols, which consume
+            the same tokens, rests which both take at least one token and
+            start with disjoint FIRST sets
+
+        every other pair keeps its order, the rest are placed greedily,
+        so the tree is the same as without the profile, a parse error
+        can list fewer expected tokens, as fewer alternatives are tried
+
+        a decorated method called directly still tries only its own
+        alternative and the ones written after it, _entryOrders holds
+        their indices in the new order for every entry but the first
+
+        terminals are told apart from token types by how the default
+        TokenType tokenizes them, see _lookaheadOverlap
+        """
+        cls._entryOrders = MappingProxyType({})
+        if cls._profile is None or cls._engine == "earley":
+            return
+
+        counts = cls._profile.get("rules", {})
+        rules, first = dict(cls._rules), cls._first
+
+        def classes(types, values):
+            return {("type", tokenType) for tokenType in types} | {("value", value) for value in values}
+
+        def matched(symbols):
+            # the symbols which take part in the match, an endpoint or
+            # a precedence chain ends it, an argumentless marker cuts it
+            for i, (kind, parameter) in enumerate(symbols):
+                if kind is ARGUMENTLESS:
+                    return symbols[:i]
+                if kind is ENDPOINT or kind is PRECEDENCE:
+                    return symbols[:i + 1]
+            return symbols
+
+        #
+        # findSingleTokenRules(rules)
+        #
+        # the tokens a symbol can be, for symbols which always take one
+        #
+        single = {}
+
+        def singleToken(kind, parameter):
+            if kind is TERMINAL:
+                return {("value", parameter)}
+            if kind is ENDPOINT:
+                return {("type", parameter)}
+            if kind is METHOD or kind is SPLICE:
+                return single.get(parameter)
+            return None
+
+        changed = True
+        while changed:
+            changed = False
+            for funcName, alternatives in rules.items():
+                if funcName in single:
+                    continue
+                tokens = set()
+                for alternative in alternatives:
+                    symbols = matched(alternative.symbols)
+                    alternativeTokens = singleToken(*symbols[0]) if len(symbols) == 1 else None
+                    if alternativeTokens is None:
+                        break
+                    tokens |= alternativeTokens
+                else:
+                    single[funcName] = tokens
+                    changed = True
+
+        def exclusive(left, right):
+            left, right = matched(left.symbols), matched(right.symbols)
+            for i, (one, other) in enumerate(zip(left, right)):
+                oneTokens, otherTokens = singleToken(*one), singleToken(*other)
+                if oneTokens is not None and otherTokens is not None:
+                    if not _lookaheadOverlap(oneTokens, otherTokens):
+                        return True
+                elif one != other:
+                    break
+            else:
+                # one matches where the other matches a prefix of
+                return False
+
+            oneTypes, oneValues, oneNullable = _first_of(left[i:], first)
+            otherTypes, otherValues, otherNullable = _first_of(right[i:], first)
+            if oneNullable or otherNullable:
+                return False
+            return not _lookaheadOverlap(classes(oneTypes, oneValues), classes(otherTypes, otherValues))
+
+        #
+        # orderByProfile(rules)
+        #
+        entryOrders = {}
+        for funcName, alternatives in cls._rules.items():
+            matches = counts.get(funcName)
+            if not matches or len(alternatives) < 2:
+                continue
+
+            remaining, ordered = list(alternatives), []
+            while remaining:
+                best = None
+                for i, alternative in enumerate(remaining):
+                    if any(not exclusive(earlier, alternative) for earlier in remaining[:i]):
+                        continue
+                    if best is None or matches.get(alternative.pattern, 0) > matches.get(remaining[best].pattern, 0):
+                        best = i
+                ordered.append(remaining.pop(best))
+
+            rules[funcName] = tuple(ordered)
+            for index in range(1, len(alternatives)):
+                entryOrders[(funcName, index)] = tuple(sorted(map(ordered.index, alternatives[index:])))
+
+        cls._rules = MappingProxyType(rules)
+        cls._entryOrders = MappingProxyType(entryOrders)
+
+    def _entryAlternatives(self, funcName, first):
+        """
+        the alternatives a call of funcName starting at first tries,
+        in order, see _reorderAlternatives
+        """
+        alternatives = self._rules[funcName]
+        order = self._entryOrders.get((funcName, first))
+        if order is None:
+            return alternatives[first:]
+        return tuple(alternatives[index] for index in order)
+
+    @classmethod
+    def _codedRules(cls):
+        """
+        the compiled tables with terminals and endpoints replaced by
+        the integer codes of the tokenizer, made once per class when it
+        is defined, which interns its terminals before its tokens are
+        coded, a store coded earlier is recoded by TokenStore.refresh
+
+        the codes only hold in this process, so these are never cached
+        """
+        coded = cls.__dict__.get("_coded")
+        if coded is not None:
+            return coded
+
+        def codeAlternative(alternative):
+            symbols = []
+            for kind, parameter in alternative.symbols:
+                if kind is TERMINAL or kind is OPERATOR:
+                    parameter = intern_value(parameter)
+                elif kind is ENDPOINT:
+                    parameter = intern_type(parameter)
+                symbols.append((kind, parameter))
+
+            return alternative._replace(symbols=tuple(symbols),
+                                        firstTypes=frozenset(map(intern_type, alternative.firstTypes)),
+                                        firstValues=frozenset(map(intern_value, alternative.firstValues)))
+
+        rules = MappingProxyType({funcName: tuple(map(codeAlternative, alternatives))
+                                  for funcName, alternatives in cls._rules.items()})
+        operators = MappingProxyType({intern_value(operator): binding for operator, binding in cls._operators.items()})
+
+        earley = None
+        if cls._engine == "earley":
+            alternatives, predictions = cls._earley
+            earley = (tuple(map(codeAlternative, alternatives)), predictions)
+
+        cls._coded = (rules, operators, earley)
+        return cls._coded
+
+    @classmethod
+    def grammar_report(cls):
+        """
+        list which rules are LL(1) and which still need backtracking
+
+        a rule is LL(1) when the next token alone decides which of its
+        alternatives to try, that is when no two alternatives can start
+        with the same token and a nullable alternative does not share
+        a token with what can follow the rule
+
+        for the other rules the report names the alternatives and tokens
+        that overlap, a terminal like 'func' overlaps the token type
+        it is tokenized as, see _lookaheadOverlap
+        """
+        def describe(lookahead):
+            return ", ".join(sorted(f"<{key}>" if kind == "type" else "end of tokens" if kind is None else f"'{key}'"
+                                    for kind, key in lookahead))
+
+        def lookahead(types, values, nullable, funcName):
+            tokens = {("type", tokenType) for tokenType in types} | {("value", value) for value in values}
+            if nullable:
+                tokens |= {(None, None) if following is None else following for following in cls._follow[funcName]}
+            return tokens
+
+        ll1, backtracking = [], []
+
+        for funcName, alternatives in cls._rules.items():
+            conflicts = []
+            for i, first in enumerate(alternatives):
+                for second in alternatives[i + 1:]:
+                    overlap = _lookaheadOverlap(lookahead(first.firstTypes, first.firstValues, first.nullable, funcName),
+                                                lookahead(second.firstTypes, second.firstValues, second.nullable, funcName))
+                    if overlap:
+                        conflicts.append(f"    '{first.pattern}' / '{second.pattern}' on {describe(overlap)}")
+
+            if conflicts:
+                backtracking.append(f"  {funcName}\n" + "\n".join(conflicts))
+            else:
+                ll1.append(f"  {funcName}")
+
+        report = ["LL(1):"] + ll1 + ["needs backtracking:"] + backtracking
+        return "\n".join(report)
 
     def _get_avalable_methods(self):
-        return list(sorted(set(map(lambda method: method[0], self._decorated_methods))))
+        return sorted(self._rules)
 
     def _is_method_avalable(self, method_name):
-        return method_name in self._get_avalable_methods()
+        return method_name in self._rules
 
     def _get_patterns(self, withName):
-        avalable_decorators = list(filter(lambda method: method[0] == withName, self._decorated_methods))
-        avalable_decorators = self._sortMethods(avalable_decorators)
-        return list(map(lambda method: method[1], avalable_decorators))
+        return [alternative.pattern for alternative in self._rules.get(withName, ())]
 
     def _get_methods(self, withName):
-        avalable_decorators = list(filter(lambda method: method[0] == withName, self._decorated_methods))
-        avalable_decorators = self._sortMethods(avalable_decorators)
-        return list(map(lambda method: method[2], avalable_decorators))
+        return [alternative.method for alternative in self._rules.get(withName, ())]
+
+    def _parseEntry(self, funcName, first=0, level=0, debug=False, args=(), kwargs={}):
+        if self._engine == "earley":
+            return self._parseEarley(funcName, first, level, debug, args, kwargs)
+        if self._engine == "stack":
+            return self._parseStack(funcName, first, level, debug, args, kwargs)
+        return self._parseRule(funcName, first, level, debug, args, kwargs)
+
+    def _parseEarley(self, funcName, first=0, level=0, debug=False, args=(), kwargs={}):
+        """
+        Earley engine
+
+        recognizes funcName from executeIndex with a chart of
+        (alternative, dot, origin) items, one set of items per token,
+        this handles left recursion and ambiguous rules without
+        backtracking in at most cubic time, linear for most grammars
+
+        the alternatives of funcName are tried in order starting with
+        the one at index first, the first that matches takes its longest
+        match, like the recursive descent engine would
+
+        the handlers are then called bottom up, where a span can be
+        derived in more than one way the earlier alternative wins
+        and the symbols to the left take as many tokens as they can
+
+        right recursive rules like "statements : statement statements"
+        complete a whole chain of items at every token, Leo's items
+        complete only the top of such a chain and the items skipped
+        are added back when the tree is built, so these stay linear
+        """
+        types, values = self._types, self._values
+        alternatives, predictions = self._earley
+        start = self.executeIndex
+
+        def leo(origin, name):
+            """
+            the link of the one item in the set at origin that name
+            completes, when that item then ends its alternative, as
+            (alternative, origin, top item, names) where the top item
+            is where the chain of such items ends and names are the
+            rules completed on the way, None when there is no chain
+
+            a match of funcName ends a chain, so it is always in the sets
+            """
+            path = []
+            while True:
+                memo = leos[origin - start]
+                if name in memo:
+                    link = memo[name]
+                    break
+
+                # a placeholder ends a chain coming back to the same set
+                memo[name] = link = None
+                waiting = waits[origin - start].get(name, ())
+                if len(waiting) != 1:
+                    break
+                waitingId, waitingDot, waitingOrigin = waiting[0]
+                if waitingDot + 1 != len(alternatives[waitingId].symbols):
+                    break
+                if waitingOrigin == start and alternatives[waitingId].name == funcName:
+                    break
+
+                path.append((origin, name, waitingId, waitingOrigin))
+                origin, name = waitingOrigin, alternatives[waitingId].name
+
+            for origin, name, waitingId, waitingOrigin in reversed(path):
+                completedName = alternatives[waitingId].name
+                if link is None:
+                    link = (waitingId, waitingOrigin, (waitingId, len(alternatives[waitingId].symbols), waitingOrigin),
+                            frozenset((completedName,)))
+                else:
+                    link = (waitingId, waitingOrigin, link[2], link[3] | {completedName})
+                leos[origin - start][name] = link
+            return link
+
+        #
+        # recognize(funcName)
+        #
+        # one chart per alternative, the first that matches wins like in
+        # the descent, so an alternative that could take the rest of the
+        # input is not run once an earlier one has matched
+        #
+        match = None
+        for entryId in predictions[funcName][first:]:
+            sets, waits, dones, leos, leaps = [], [], [], [], []
+            agenda = [(entryId, 0, start)]
+            position = start
+
+            while agenda:
+                items, waiting, done, predicted, leaped = set(agenda), {}, {}, set(), []
+                sets.append(items)
+                waits.append(waiting)
+                dones.append(done)
+                leos.append({})
+                leaps.append(leaped)
+
+                if position < len(types):
+                    tokenType, tokenValue = types[position], values[position]
+                else:
+                    tokenType = tokenValue = None
+
+                scanned = []
+                i = 0
+                while i < len(agenda):
+                    item = agenda[i]
+                    i += 1
+                    altId, dot, origin = item
+                    alternative = alternatives[altId]
+                    symbols = alternative.symbols
+
+                    # complete(item)
+                    if dot == len(symbols):
+                        origins = done.setdefault(alternative.name, set())
+                        if origin in origins:
+                            continue
+                        origins.add(origin)
+
+                        # a set before this one is complete, its chains are known
+                        link = leo(origin, alternative.name) if origin < position else None
+                        if link is not None:
+                            leaped.append((alternative.name, origin, link[3]))
+                            if link[2] not in items:
+                                items.add(link[2])
+                                agenda.append(link[2])
+                            continue
+
+                        for waitingId, waitingDot, waitingOrigin in waits[origin - start].get(alternative.name, ()):
+                            advanced = (waitingId, waitingDot + 1, waitingOrigin)
+                            if advanced not in items:
+                                items.add(advanced)
+                                agenda.append(advanced)
+                        continue
+
+                    kind, parameter = symbols[dot]
+
+                    # predict(item)
+                    if kind is METHOD or kind is SPLICE:
+                        waiting.setdefault(parameter, []).append(item)
+
+                        if parameter not in predicted:
+                            predicted.add(parameter)
+                            for predictedId in predictions[parameter]:
+                                prediction = alternatives[predictedId]
+                                if prediction.nullable or tokenType in prediction.firstTypes or tokenValue in prediction.firstValues:
+                                    if (predictedId, 0, position) not in items:
+                                        items.add((predictedId, 0, position))
+                                        agenda.append((predictedId, 0, position))
+
+                        if self._first[parameter][2] or position in done.get(parameter, ()):
+                            advanced = (altId, dot + 1, origin)
+                            if advanced not in items:
+                                items.add(advanced)
+                                agenda.append(advanced)
+
+                    # scan(item)
+                    elif (kind is TERMINAL or kind is OPERATOR) and tokenValue == parameter or kind is ENDPOINT and tokenType == parameter:
+                        scanned.append((altId, dot + 1, origin))
+
+                if position >= len(types):
+                    break
+
+                agenda = list(dict.fromkeys(scanned))
+                position += 1
+
+            # longest match of this alternative
+            complete = (entryId, len(alternatives[entryId].symbols), start)
+            for end in range(len(sets) - 1, -1, -1):
+                if complete in sets[end]:
+                    match = (entryId, start + end)
+                    break
+
+            self.chartItems += sum(map(len, sets))
+
+            # the last set is as far as any item got
+            farthest = start + len(sets) - 1
+            if farthest >= self._farthest:
+                for altId, dot, origin in sets[-1]:
+                    if dot < len(alternatives[altId].symbols):
+                        self._expect(farthest, alternatives[altId].symbols[dot])
+
+            if match is not None:
+                break
+
+        def completed(name, end):
+            """
+            the items of set end, with every item a Leo item skipped
+            there that completes name added back
+            """
+            leaped, kept = leaps[end - start], []
+            items, done = sets[end - start], dones[end - start]
+
+            for leapName, origin, names in leaped:
+                if name not in names:
+                    kept.append((leapName, origin, names))
+                    continue
+
+                link = leos[origin - start].get(leapName)
+                while link is not None:
+                    waitingId, waitingOrigin = link[0], link[1]
+                    items.add((waitingId, len(alternatives[waitingId].symbols), waitingOrigin))
+                    leapName = alternatives[waitingId].name
+                    done.setdefault(leapName, set()).add(waitingOrigin)
+                    link = leos[waitingOrigin - start].get(leapName)
+
+            leaped[:] = kept
+            return items
+
+        if match is None:
+            if debug:
+                print(" " * (level * 4), f"[!] earley > no alternative of {funcName} matched at index {start}")
+            return Error
+
+        #
+        # indexItems(sets)
+        #
+        # the positions of every item inside an alternative, so a split
+        # looks at where its left part ended instead of at every origin
+        #
+        positions = {}
+        for index, items in enumerate(sets):
+            for item in items:
+                if item[1]:
+                    positions.setdefault(item, []).append(start + index)
+
+        def chooseAlternative(funcName, origin, end):
+            items = completed(funcName, end)
+            for altId in predictions[funcName]:
+                if (altId, len(alternatives[altId].symbols), origin) in items:
+                    return altId
+
+        def split(altId, origin, end):
+            symbols = alternatives[altId].symbols
+            spans = []
+            for dot in range(len(symbols), 0, -1):
+                kind, parameter = symbols[dot - 1]
+                if kind is METHOD or kind is SPLICE:
+                    completed(parameter, end)
+                    origins = dones[end - start][parameter]
+                    if dot == 1:
+                        childOrigin = origin
+                    else:
+                        childOrigin = max(childOrigin for childOrigin in positions[(altId, dot - 1, origin)] if childOrigin in origins)
+                    spans.append((kind, parameter, childOrigin, end))
+                    end = childOrigin
+                else:
+                    end -= 1
+                    spans.append((kind, parameter, end, end + 1))
+            spans.reverse()
+            return spans
+
+        #
+        # buildTree(match)
+        #
+        # explicit stack of [alternative, spans, next span, arguments],
+        # so deep trees do not hit the recursion limit
+        #
+        altId, end = match
+        stack = [[altId, split(altId, start, end), 0, []]]
+
+        while True:
+            frame = stack[-1]
+            altId, spans, index, arguments_data = frame
+
+            if index < len(spans):
+                frame[2] += 1
+                kind, parameter, origin, childEnd = spans[index]
+
+                if kind is METHOD or kind is SPLICE:
+                    childId = chooseAlternative(parameter, origin, childEnd)
+                    stack.append([childId, split(childId, origin, childEnd), 0, []])
+                elif kind is ENDPOINT or kind is OPERATOR or types[origin] == _OPERATOR_TYPE:
+                    arguments_data.append(self.tokens.value(origin))
+                continue
+
+            stack.pop()
+            alternative = alternatives[altId]
+
+            if alternative.symbols and alternative.symbols[-1][0] is ENDPOINT:
+                retval = alternative.handler(self, arguments_data[-1])
+            elif stack:
+                retval = alternative.handler(self, **dict(zip(alternative.arguments, arguments_data)))
+            else:
+                newkwargs = dict(zip(alternative.arguments, arguments_data))
+                retval = alternative.handler(self, *args, **{**newkwargs, **kwargs})
+
+            if not stack:
+                break
+
+            parent = stack[-1]
+            if parent[1][parent[2] - 1][0] is SPLICE:
+                parent[3] += retval
+            else:
+                parent[3].append(retval)
+
+        if debug:
+            print(" " * (level * 4), f"earley > parsed {funcName} from index {start} to {end}, returned {retval}")
+
+        self.executeIndex = end
+        return retval
+
+    def _parseStack(self, funcName, first=0, level=0, debug=False, args=(), kwargs={}):
+        """
+        the descent engine run by a loop over an explicit stack
+        instead of python recursion
+
+        the rule being parsed lives in local variables, calling another
+        rule pushes them onto the stack and returning pops them back,
+        so nesting is only limited by memory and a rule costs no
+        python call
+
+        alternatives are tried in the same order, with the same
+        lookahead skips and packrat memo as _parseRule, so the
+        values are the same as the ones of the descent engine
+
+        there is no python call per rule to wrap, when _trace is set,
+        as by tracing.Tracer, its enterRule(name), leaveRule(name,
+        matched) and leaveAlternative(alternative, start, matched)
+        are called where _parseRule and _parseAlternative would be
+        """
+        rules, types, values, memo, operators = self._rules, self._types, self._values, self.memo, self._operators
+        strings = self._strings
+        trace = self._trace
+        length = len(types)
+        stack = []
+
+        # the rule being parsed, running is the alternative tried last
+        alternatives, nextAlternative, memoKey, start = self._entryAlternatives(funcName, first), 0, None, self.executeIndex
+        alternative = running = symbols = position = data = chain = None
+        returned = _Pending
+
+        if trace is not None:
+            trace.enterRule(funcName)
+
+        while True:
+            result = _Pending
+            call = None
+
+            #
+            # resumeAlternative(returned)
+            #
+            # the rule called at position returned, chain holds
+            # [operands, pending operators, index and (operator, power, associativity)
+            # of the operator waiting for its operand] of a precedence symbol
+            #
+            if returned is not _Pending:
+                kind = symbols[position][0]
+
+                try:
+                    if kind is PRECEDENCE and chain is not None:
+                        if returned is Error:
+                            self.executeIndex = chain[2]
+                            result = self._reduceChain(alternative.handler, alternative.arguments, chain[0], chain[1], 0, "left", args, kwargs)
+                        else:
+                            operator, power, associativity = chain[3]
+                            self._reduceChain(alternative.handler, alternative.arguments, chain[0], chain[1], power, associativity, args, kwargs)
+                            chain[1].append((operator, power))
+                            chain[0].append(returned)
+                    elif returned is Error:
+                        alternative = None
+                    elif kind is PRECEDENCE:
+                        chain = [[returned], [], None, None]
+                    elif kind is SPLICE:
+                        data += returned
+                        position += 1
+                    else:
+                        data.append(returned)
+                        position += 1
+
+                except ParseError:
+                    alternative = None
+
+                returned = _Pending
+
+            #
+            # selectAlternative(start)
+            #
+            if alternative is None and result is _Pending:
+                if trace is not None and running is not None:
+                    trace.leaveAlternative(running, start, False)
+                self.executeIndex = start
+
+                if start < length:
+                    tokenType, tokenValue = types[start], values[start]
+                else:
+                    tokenType = tokenValue = None
+
+                while nextAlternative < len(alternatives):
+                    candidate = alternatives[nextAlternative]
+                    nextAlternative += 1
+
+                    if candidate.nullable or tokenType in candidate.firstTypes or tokenValue in candidate.firstValues:
+                        alternative = running = candidate
+                        symbols, position, data, chain = candidate.symbols, 0, [], None
+                        break
+                else:
+                    result = Error
+                    if start >= self._farthest:
+                        self._expect(start, (METHOD, alternatives[0].name))
+
+                if debug and alternative is not None:
+                    print(" " * ((level + len(stack)) * 4), f"{alternative.handler.__name__} > trying {alternative.pattern} at {start}")
+
+            #
+            # runAlternative(position)
+            #
+            # stops when the alternative needs another rule,
+            # fails or has a value
+            #
+            if result is _Pending:
+                handler = alternative.handler
+
+                while position < len(symbols):
+                    kind, parameter = symbols[position]
+
+                    if kind is TERMINAL:
+                        index = self.executeIndex
+
+                        if index < length and values[index] == parameter:
+                            self.executeIndex += 1
+                            if types[index] == _OPERATOR_TYPE:
+                                data.append(strings[parameter])
+                            position += 1
+                        else:
+                            if index >= self._farthest:
+                                self._expect(index, (kind, parameter))
+                            alternative = None
+                            break
+
+                    elif kind is METHOD or kind is SPLICE:
+                        call = parameter
+                        break
+
+                    elif kind is ENDPOINT:
+                        index = self.executeIndex
+
+                        if index < length and types[index] == parameter:
+                            self.executeIndex += 1
+                            try:
+                                result = handler(self, self.tokens.value(index))
+                            except ParseError:
+                                alternative = None
+                        else:
+                            if index >= self._farthest:
+                                self._expect(index, (kind, parameter))
+                            alternative = None
+                        break
+
+                    elif kind is ARGUMENTLESS:
+                        break
+
+                    elif kind is PRECEDENCE:
+                        index = self.executeIndex
+
+                        if chain is None:
+                            call = parameter
+                        elif index < length and values[index] in operators:
+                            chain[2], chain[3] = index, (strings[values[index]], *operators[values[index]])
+                            self.executeIndex += 1
+                            call = parameter
+                        else:
+                            if index >= self._farthest:
+                                for code in operators:
+                                    self._expect(index, (OPERATOR, code))
+                            try:
+                                result = self._reduceChain(handler, alternative.arguments, chain[0], chain[1], 0, "left", args, kwargs)
+                            except ParseError:
+                                alternative = None
+                        break
+
+                if alternative is not None and call is None and result is _Pending:
+                    newkwargs = dict(zip(alternative.arguments, data))
+                    try:
+                        result = handler(self, *args, **{**newkwargs, **kwargs}) if kwargs else handler(self, *args, **newkwargs)
+                    except ParseError:
+                        alternative = None
+
+                if alternative is None and result is _Pending:
+                    if debug:
+                        print(" " * ((level + len(stack)) * 4), f"[!] {handler.__name__} > backtracking from {self.executeIndex} to {start}")
+                    continue
+
+            #
+            # callRule(call)
+            #
+            # the memo is looked up before pushing,
+            # a remembered value is resumed with right away
+            #
+            if call is not None:
+                if memo is not None:
+                    key = (call, self.executeIndex)
+                    if key in memo:
+                        memo.move_to_end(key)
+                        returned, self.executeIndex = memo[key]
+                        continue
+                else:
+                    key = None
+
+                stack.append((alternatives, nextAlternative, memoKey, start, alternative, symbols, position, data, chain, args, kwargs))
+                alternatives, nextAlternative, memoKey, start = rules[call], 0, key, self.executeIndex
+                alternative = running = None
+                args, kwargs = (), {}
+
+                if trace is not None:
+                    trace.enterRule(call)
+                continue
+
+            #
+            # returnFromRule(result)
+            #
+            if memoKey is not None:
+                memo[memoKey] = (result, self.executeIndex)
+                if len(memo) > self.memoSize:
+                    memo.popitem(last=False)
+
+            if debug:
+                print(" " * ((level + len(stack)) * 4), f"rule returned {result}, now at index {self.executeIndex}")
+
+            # a failed rule told about its last alternative when it failed
+            if trace is not None:
+                if result is not Error:
+                    trace.leaveAlternative(running, start, True)
+                trace.leaveRule(alternatives[0].name, result is not Error)
+
+            if not stack:
+                return result
+
+            alternatives, nextAlternative, memoKey, start, alternative, symbols, position, data, chain, args, kwargs = stack.pop()
+            running, returned = alternative, result
+
+    def _parseRule(self, funcName, first=0, level=0, debug=False, args=(), kwargs={}):
+        """
+        try the alternatives of funcName starting with the one at index first,
+        return the value of the first one which matches or Error
+        """
+        startingPosition = self.executeIndex
+
+        if startingPosition < len(self._types):
+            tokenType, tokenValue = self._types[startingPosition], self._values[startingPosition]
+        else:
+            tokenType = tokenValue = None
+
+        for alternative in (self._entryAlternatives(funcName, first) if first else self._rules[funcName]):
+
+            # skip alternatives which can not start with the next token
+            if not alternative.nullable and tokenType not in alternative.firstTypes and tokenValue not in alternative.firstValues:
+                continue
+
+            # handlers may still reject what they were given
+            try:
+                retval = self._parseAlternative(alternative, level, debug, args, kwargs)
+            except ParseError as e:
+                if debug:
+                    print(" " * (level * 4), f"[!] {alternative.handler.__name__} > recieved ParseError", e)
+                retval = Error
+
+            if retval is not Error:
+                return retval
+
+            if debug:
+                print(" " * (level * 4), f"[!] {alternative.handler.__name__} > backtracking from {self.executeIndex} to {startingPosition}")
+
+            self.executeIndex = startingPosition
+
+        if startingPosition >= self._farthest:
+            self._expect(startingPosition, (METHOD, funcName))
+
+        return Error
+
+    def _parseAlternative(self, alternative, level, debug, args, kwargs):
+        funcName, expectedPattern, symbols, arguments, handler, method, firstTypes, firstValues, nullable = alternative
+        types, values = self._types, self._values
+
+        arguments_data = []
+
+        for kind, parameter in symbols:
+
+            # parseOperator(parameter)
+            # parseIgnorableChar(parameter)
+            #
+            # operators are kept as arguments, any other character
+            # is only asserted to be there
+            #
+            if kind is TERMINAL:
+                index = self.executeIndex
+
+                if index < len(values) and values[index] == parameter:
+                    self.executeIndex += 1
+
+                    if types[index] == _OPERATOR_TYPE:
+                        arguments_data.append(self._strings[parameter])
+
+                    if debug:
+                        print(" " * (level * 4), f"{handler.__name__} > consumed {self.tokens[index]}")
+                else:
+                    if index >= self._farthest:
+                        self._expect(index, (kind, parameter))
+                    if debug:
+                        print(" " * (level * 4), f"[!] {handler.__name__} > invalid pattern, got '{self._peek(peekIndex=index)}' expected '{self._strings[parameter]}'")
+                    return Error
+
+            # parseRecursive(parameter)
+            # parseAutoedit(parameter)
+            #
+            # call the rule, values of rules generated by
+            # leftRecursionErrorHandler are spliced into the arguments
+            #
+            elif kind is METHOD or kind is SPLICE:
+
+                if debug:
+                    print(" " * (level * 4), f"{handler.__name__} > parsing callable {parameter}")
+
+                parsed = self._tryParsing(parameter, level, debug=debug)
+
+                if parsed is Error:
+                    return Error
+
+                if debug:
+                    print(" " * (level * 4), f"{handler.__name__} > callable returned {parsed}, now at index {self.executeIndex}")
+
+                if kind is SPLICE:
+                    arguments_data += parsed
+                else:
+                    arguments_data.append(parsed)
+
+            # parsePrecedence(parameter)
+            #
+            # the whole chain is reduced with the function,
+            # its value is the value of the rule
+            #
+            elif kind is PRECEDENCE:
+                return self._parsePrecedence(parameter, handler, arguments, level, debug, args, kwargs)
+
+            # parseEndpoint(parameter)
+            #
+            elif kind is ENDPOINT:
+                index = self.executeIndex
+
+                if index < len(types) and types[index] == parameter:
+                    self.executeIndex += 1
+                    retval = handler(self, self.tokens.value(index))
+
+                    if debug:
+                        print(" " * (level * 4), f"{handler.__name__} > parsing endpoint {funcName} with value {retval}")
+
+                    return retval
+                else:
+                    if index >= self._farthest:
+                        self._expect(index, (kind, parameter))
+                    if debug:
+                        print(" " * (level * 4), f"[!] {handler.__name__} > endpoint: invalid pattern, got '{self._peek(peekIndex=index)}' expected '{funcName}'")
+                    return Error
+
+            # parseArgumentless(parameter)
+            #
+            elif kind is ARGUMENTLESS:
+
+                if debug:
+                    print(" " * (level * 4), f"{handler.__name__} > calling argumentless function {handler.__name__}")
+
+                break
+
+        newkwargs = dict(zip(arguments, arguments_data))
+        retval = handler(self, *args, **{**newkwargs, **kwargs}) if kwargs else handler(self, *args, **newkwargs)
+
+        if debug:
+            print(" " * (level * 4), f"{handler.__name__} > function {handler.__name__} returned {retval}")
+
+        return retval
+
+    def _parsePrecedence(self, operand, handler, arguments, level, debug, args, kwargs):
+        """
+        precedence climbing over operand (operator operand)*
+
+        operands wait on a stack until no operator binding at least as
+        tight can follow them, so long chains need no recursion
+
+        a missing operand after an operator ends the chain
+        before that operator, where no operator follows every
+        operator is expected, as one could have continued the chain
+        """
+        operators, values = self._operators, self._values
+
+        parsed = self._tryParsing(operand, level, debug=debug)
+        if parsed is Error:
+            return Error
+
+        operands = [parsed]
+        pending = []
+
+        while True:
+            index = self.executeIndex
+            if index >= len(values) or values[index] not in operators:
+                if index >= self._farthest:
+                    for code in operators:
+                        self._expect(index, (OPERATOR, code))
+                break
+
+            operator = self._strings[values[index]]
+            power, associativity = operators[values[index]]
+            self.executeIndex += 1
+
+            parsed = self._tryParsing(operand, level, debug=debug)
+            if parsed is Error:
+                self.executeIndex = index
+                break
+
+            self._reduceChain(handler, arguments, operands, pending, power, associativity, args, kwargs)
+
+            if debug:
+                print(" " * (level * 4), f"{handler.__name__} > operator {operator} with binding power {power}")
+
+            pending.append((operator, power))
+            operands.append(parsed)
+
+        return self._reduceChain(handler, arguments, operands, pending, 0, "left", args, kwargs)
+
+    def _reduceChain(self, handler, arguments, operands, pending, power, associativity, args, kwargs):
+        """
+        call the function for every pending operator which binds
+        tighter than power, or as tight when associativity is left,
+        a power of 0 reduces the whole chain
+
+        returns the leftmost operand
+        """
+        while pending and (pending[-1][1] > power or pending[-1][1] == power and associativity == "left"):
+            right, left = operands.pop(), operands.pop()
+            newkwargs = dict(zip(arguments, (left, pending.pop()[0], right)))
+            operands.append(handler(self, *args, **{**newkwargs, **kwargs}))
+
+        return operands[0]
 
     def _tryParsing(self, method_name, level, debug):
-        if self._is_method_avalable(method_name):
-            return self._get_methods(method_name)[0](self, level=level + 1, debug=debug)
+        """
+        parse the rule method_name at the current index
+
+        packrat parsing:
+            when the memo is enabled, the result and end index of every
+            rule tried at a given index are remembered, failures included,
+            so a rule is parsed at most once per index while backtracking
+            alternatives share a common prefix
+
+            the memo is a LRU table of at most memoSize entries
+        """
+        if self.memo is None:
+            return self._parseRule(method_name, 0, level + 1, debug)
+
+        key = (method_name, self.executeIndex)
+
+        if key in self.memo:
+            self.memo.move_to_end(key)
+            parsed, self.executeIndex = self.memo[key]
+            return parsed
+
+        parsed = self._parseRule(method_name, 0, level + 1, debug)
+
+        self.memo[key] = (parsed, self.executeIndex)
+        if len(self.memo) > self.memoSize:
+            self.memo.popitem(last=False)
+
+        return parsed
+
+    def _expect(self, index, symbol):
+        """
+        remember that symbol was expected at index, only
+        the farthest index is kept
+        """
+        if index > self._farthest:
+            self._farthest, self._expected = index, {symbol}
+        else:
+            self._expected.add(symbol)
+
+    def _parseError(self):
+        """
+        the ParseError for the farthest index, with every rule
+        expected there replaced by the tokens it can start with
+        """
+        index = self._farthest
+        expected = set()
+
+        for kind, parameter in self._expected:
+            if kind is METHOD or kind is SPLICE or kind is PRECEDENCE:
+                types, values, nullable = self._first[parameter]
+                expected |= set(types) | {f"'{value}'" for value in values}
+            elif kind is ENDPOINT:
+                expected.add(self.tokens.typeNames[parameter])
+            else:
+                expected.add(f"'{self._strings[parameter]}'")
+
+        expected = sorted(expected)
+        got = f"'{self.tokens.value(index)}'" if index < len(self._values) else "end of input"
+
+        index += self.tokens.base
+        return ParseError(f"expected {', '.join(expected)} at token {index}, got {got}", index, expected)
 
     def _peek(self, expected_type=None, expected_value=None, peekIndex=0):
-        if peekIndex >= len(self.tokens):
+        if peekIndex >= len(self._types):
             return False
 
         if expected_type is not None:
-            return self.tokens[peekIndex].type == expected_type.strip()
+            return self._types[peekIndex] == intern_type(expected_type.strip())
 
         if expected_value is not None:
-            return self.tokens[peekIndex].value == expected_value.strip()
+            return self.tokens.value(peekIndex) == expected_value.strip()
 
         return self.tokens[peekIndex]
 
     def _consume(self, *, expected_type=None, expected_value=None, consumeIndex=0):
-        if expected_type is not None and self.tokens[consumeIndex].type == expected_type.strip():
+        if expected_type is not None and self._types[consumeIndex] == intern_type(expected_type.strip()):
             self.executeIndex += 1
-            return self.tokens[consumeIndex].value
+            return self.tokens.value(consumeIndex)
 
-        if expected_value is not None and self.tokens[consumeIndex].value == expected_value.strip():
+        if expected_value is not None and self.tokens.value(consumeIndex) == expected_value.strip():
             self.executeIndex += 1
-            return self.tokens[consumeIndex].value
+            return self.tokens.value(consumeIndex)
 
         raise AssertionError(f"neither expected_type {expected_type} nor expected_value {expected_value} match token {self.tokens[consumeIndex]}")
 
-    def _sortMethods(self, methods):
+    @staticmethod
+    def _sortMethods(methods):
         output = [fn for fn in methods if 'autoedit' in fn[1]]
         output += [fn for fn in methods if fn[0] + "\'" in fn[1]]
         output += [fn for fn in methods if 'autoedit' not in fn[1] and fn[0] + "\'" not in fn[1]]
@@ -452,6 +1905,11 @@ class Parser:
 
 
 class MyParser(Parser, shouldHandleLeftRecursion=True):
+    precedence = (
+        ("left", "+"),
+        ("left", "*"),
+    )
+
     #
     # Start Of File
     #
@@ -594,15 +2052,6 @@ class MyParser(Parser, shouldHandleLeftRecursion=True):
     # Statements
     #
 
-    @_("statements : statements statement")
-    def parse_statements(self, statement, statements):
-        return [statement, *statements]
-
-    @_("statements : statement")
-    def parse_statements2(self, statement):
-        return [statement]
-
-    """
     @_("statements : statement statements")
     def parse_statements(self, statement, statements):
         return [statement, *statements]
@@ -610,7 +2059,6 @@ class MyParser(Parser, shouldHandleLeftRecursion=True):
     @_("statements : statement")
     def parse_statements2(self, statement):
         return [statement]
-    """
 
     #
     # Statement
@@ -644,21 +2092,9 @@ class MyParser(Parser, shouldHandleLeftRecursion=True):
     # Expression
     #
 
-    @_("expr : expr + term")
-    def parse_sum(self, expr1, op, term2):
-        return BinaryOperationNode(expr1, op, term2)
-
-    @_("expr : term")
-    def parse_sum2(self, term):
-        return term
-
-    @_("term : term * factor")
-    def parse_mult(self, term1, op, factor2):
-        return BinaryOperationNode(term1, op, factor2)
-
-    @_("term : factor")
-    def parse_mult2(self, factor):
-        return factor
+    @_("expr : precedence factor")
+    def parse_binary_operation(self, expr1, op, expr2):
+        return BinaryOperationNode(expr1, op, expr2)
 
     # factor
 
@@ -1,4 +1,7 @@
+from array import array
 from dataclasses import dataclass
+import codecs
+import os
 import re
 
 
@@ -22,31 +25,268 @@ class Token:
     value: str
 
 
+_compiled_token_types = {}
+_whitespace = re.compile(r'\s*')
+
+# process wide tables of token type names and of the token values
+# grammars use as terminals, a name or value keeps its integer code
+# for the life of the process, the values of a program are never added
+_type_ids = {}
+_type_names = []
+_value_codes = {}
+_value_strings = []
+
+
+def intern_type(name):
+    code = _type_ids.get(name)
+    if code is None:
+        code = _type_ids[name] = len(_type_names)
+        _type_names.append(name)
+    return code
+
+
+def intern_value(value):
+    """
+    the code of a terminal of a grammar, other values are not interned
+    so the table stays as small as the grammars using it
+    """
+    code = _value_codes.get(value)
+    if code is None:
+        code = _value_codes[value] = len(_value_strings)
+        _value_strings.append(value)
+    return code
+
+
+def compile_token_types(token_types):
+    """
+    join every TokenType field into one regex with a named group per type
+
+    the alternation keeps the field order, so the first type which
+    matches wins, exactly like trying each type one after another
+
+    the old tokenizer matched on a freshly sliced string, where a leading
+    '\\b' only asserts that the token starts with a word character.
+    scanning with a moving position would make it look at the previous
+    character as well, so it is rewritten to '(?=\\w)'
+
+    compiled patterns are cached for the whole process
+    """
+    key = tuple(token_types)
+
+    if key not in _compiled_token_types:
+        groups = []
+        for tokenType, reg in key:
+            reg = re.sub(r'(^|\||\()\\b', r'\1(?=\\w)', reg)
+            groups.append("(?P<{name}>{reg})".format(name=tokenType, reg=reg))
+        _compiled_token_types[key] = re.compile("|".join(groups))
+
+    return _compiled_token_types[key]
+
+
 class Tokenizer:
     def __init__(self, code):
         self.TOKEN_TYPES = TokenType()
         self.code = code
+        self.position = 0
 
     def tokenize(self):
         tokens = []
 
-        while len(self.code) != 0:
+        while self.position < len(self.code):
             tokens.append(self.tokenize_one_token())
-            self.code = self.code.strip()
+            self.position = _whitespace.match(self.code, self.position).end()
         return tokens
 
     def tokenize_one_token(self):
-        for (tokenType, reg) in self.TOKEN_TYPES:
-            reg = "\A({reg})".format(reg=reg)
-            match = re.search(reg, self.code)
-            if match is not None:
-                value = match.group(1)
-                self.code = self.code[len(value):]
-                return Token(tokenType, value)
+        match = compile_token_types(self.TOKEN_TYPES).match(self.code, self.position)
+        if match is not None:
+            self.position = match.end()
+            return Token(match.lastgroup, match.group())
+
+        raise RuntimeError("Couldn't match token on {}".format(self.code[self.position:]))
+
+    def tokenize_store(self):
+        """
+        the same tokens as tokenize() in a TokenStore,
+        no Token or value string is kept per token
+        """
+        store = TokenStore(self.code)
+        regex = compile_token_types(self.TOKEN_TYPES)
+        code, append = self.code, store.append
+
+        while self.position < len(code):
+            match = regex.match(code, self.position)
+            if match is None:
+                raise RuntimeError("Couldn't match token on {}".format(code[self.position:]))
+
+            append(match.lastgroup, match.start(), match.end())
+            self.position = _whitespace.match(code, match.end()).end()
+        return store
+
+    @classmethod
+    def iter_tokens(cls, source, chunk_size=1 << 16):
+        """
+        lazily yield the same tokens as Tokenizer(code).tokenize()
+        without holding the whole program in memory
+
+        source can be a path, a text or binary file object or an mmap,
+        it is read chunk_size characters (or bytes) at a time
+
+        no token type spans whitespace, so only the part of the buffer
+        up to its last whitespace character is tokenized, the rest
+        is carried over and joined with the next chunk
+
+        memory is bounded by chunk_size and the longest run of
+        characters without whitespace
+        """
+        tokenizer = cls("")
+        started = False
+
+        for chunk, final in _read_chunks(source, chunk_size):
+            carried = tokenizer.code[tokenizer.position:]
+            tokenizer.code = carried + chunk
+            tokenizer.position = 0
+
+            if final:
+                end = len(tokenizer.code)
+            else:
+                end = len(tokenizer.code)
+                while end > len(carried) and not tokenizer.code[end - 1].isspace():
+                    end -= 1
+                if end == len(carried):
+                    continue
+
+            if started:
+                tokenizer.position = _whitespace.match(tokenizer.code).end()
+
+            while tokenizer.position < end:
+                yield tokenizer.tokenize_one_token()
+                started = True
+                tokenizer.position = _whitespace.match(tokenizer.code, tokenizer.position).end()
+
+
+class TokenStore:
+    """
+    tokens as parallel arrays of integers over the source they came from
+
+        types   id of the token type, see intern_type()
+        codes   code of the value of the token when some grammar
+                interned it as a terminal, see intern_value(),
+                -1 for every other value
+        starts  offset of the first character of the token
+        ends    offset after its last character
+
+    a token costs 13 bytes instead of a Token object and its value string,
+    values are sliced from the source only when asked for, indexing
+    the store gives Token objects made on the fly
+
+    values a grammar matches compare as integers, any other value,
+    an identifier or a literal that is no terminal, is only matched by
+    type, so the values of a program do not fill the process wide table
+
+    base is the position of the first token in the whole program
+    when the store only holds part of it, errors are reported from there
+    """
+    def __init__(self, source="", base=0):
+        offsets = 'I' if len(source) < 1 << 32 else 'Q'
+
+        self.source = source
+        self.base = base
+        self.types = array('B')
+        self.codes = array('i')
+        self.starts = array(offsets)
+        self.ends = array(offsets)
+
+        self.strings = _value_strings
+        self.typeNames = _type_names
+
+        # values interned before the tokens were coded
+        self.interned = len(_value_strings)
+
+    @classmethod
+    def fromTokens(cls, tokens, base=0):
+        """
+        a store for Token objects, their values are joined
+        into a source with one space between each token
+        """
+        tokens = list(tokens)
+        store = cls(" ".join(token.value for token in tokens), base)
+
+        start = 0
+        for token in tokens:
+            store.append(token.type, start, start + len(token.value))
+            start += len(token.value) + 1
+        return store
+
+    def append(self, tokenType, start, end):
+        self.types.append(intern_type(tokenType))
+        self.codes.append(_value_codes.get(self.source[start:end], -1))
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def refresh(self):
+        """
+        code the tokens whose values were interned after they were
+        appended, a grammar made after the store interns its terminals
+        only when it is first used
+        """
+        if self.interned == len(_value_strings):
+            return
+
+        codes, starts, ends, source = self.codes, self.starts, self.ends, self.source
+        for index in range(len(codes)):
+            if codes[index] < 0:
+                codes[index] = _value_codes.get(source[starts[index]:ends[index]], -1)
+        self.interned = len(_value_strings)
+
+    def type(self, index):
+        return self.typeNames[self.types[index]]
+
+    def value(self, index):
+        code = self.codes[index]
+        if code >= 0:
+            return self.strings[code]
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return Token(self.type(index), self.value(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield Token(self.type(index), self.value(index))
+
+
+def _read_chunks(source, chunk_size):
+    """
+    yield (text, final) pairs from a path, file object or mmap,
+    bytes are decoded as utf-8 without splitting multibyte characters
+    """
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, 'r', encoding='utf-8') as file:
+            yield from _read_chunks(file, chunk_size)
+        return
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        yield chunk, False
 
-        raise RuntimeError("Couldn't match token on {}".format(self.code))
+    yield decoder.decode(b'', final=True), True
 
 
-with open('program.swft', 'r') as file:
-    t = Tokenizer(file.read())
-    t.tokenize()
+if __name__ == "__main__":
+    with open('program.swft', 'r') as file:
+        t = Tokenizer(file.read())
+        t.tokenize()
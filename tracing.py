@@ -0,0 +1,301 @@
+import argparse
+from contextlib import contextmanager
+import json
+from time import perf_counter_ns
+
+from tokenizer import Tokenizer
+from tokenParser import Parser, MyParser, Error
+from generator import Generator
+
+# bump when the profile written by Tracer changes shape
+_PROFILE_VERSION = 1
+
+
+class _StackParser(MyParser, engine="stack"):
+    pass
+
+
+class Stats:
+    """
+    counters of one rule or node type, times are in nanoseconds
+
+    inclusive time counts every call, so it counts a recursive
+    rule once per level it is nested in
+    """
+    __slots__ = ("calls", "successes", "failures", "backtracked", "inclusive", "exclusive")
+
+    def __init__(self):
+        self.calls = self.successes = self.failures = 0
+        self.backtracked = self.inclusive = self.exclusive = 0
+
+    def _asdict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={value!r}" for field, value in self._asdict().items())
+        return f"Stats({fields})"
+
+
+class Tracer:
+    """
+    counts and times the rules of the parsers and the nodes of the
+    generators it is installed on
+
+        rules         rule name to Stats, backtracked is the number of
+                      tokens consumed by alternatives which then failed
+        alternatives  (rule name, pattern) to [tries, matches]
+        nodes         node class name to Stats of its handler
+        stacks        folded stack of rule and node names to the time
+                      spent in its last frame, see flamegraph()
+
+    install() replaces the methods of one parser or generator instance
+    with counting ones, classes are not touched, so nothing is paid
+    where no tracer is installed
+
+    rules are traced as the recursive descent engine runs them, the
+    stack engine tells the tracer about its rules from its loop, so a
+    traced parse nests no deeper than an untraced one, the earley
+    engine has no call per rule, so only its entry rules are traced
+
+    example:
+        tracer = Tracer()
+        tree = tracer.install(MyParser(tokens)).parse()
+        code = tracer.install(Generator(tree)).generate()
+        print(tracer.report())
+    """
+
+    def __init__(self, clock=perf_counter_ns):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.rules = {}
+        self.alternatives = {}
+        self.nodes = {}
+        self.stacks = {}
+
+        # [folded stack, start, time spent in children] per active frame
+        self._frames = []
+
+    def install(self, target):
+        """
+        trace a Parser or Generator instance, returns it
+        """
+        if isinstance(target, Parser):
+            self._installParser(target)
+        elif isinstance(target, Generator):
+            self._installGenerator(target)
+        else:
+            raise TypeError(f"can not trace {type(target).__name__}, expected a Parser or a Generator")
+        return target
+
+    def uninstall(self, target):
+        for name in ("_parseEntry", "_parseRule", "_parseAlternative", "_trace", "_handlers", "_streamers"):
+            target.__dict__.pop(name, None)
+
+    @contextmanager
+    def tracing(self, target):
+        self.install(target)
+        try:
+            yield target
+        finally:
+            self.uninstall(target)
+
+    def _installParser(self, parser):
+        parseAlternative = parser._parseAlternative
+        root = type(parser).__name__
+
+        if parser._engine == "stack":
+            self._installStack(parser, root)
+            return
+
+        # a chart parser has no call per rule, only the entry is traced
+        parseRule = parser._parseEntry if parser._engine == "earley" else parser._parseRule
+
+        def tracedRule(funcName, first=0, level=0, debug=False, args=(), kwargs={}):
+            self._enter(root, funcName)
+            retval = Error
+            try:
+                retval = parseRule(funcName, first, level, debug, args, kwargs)
+                return retval
+            finally:
+                self._leave(self.rules, funcName, retval is not Error)
+
+        def tracedAlternative(alternative, level, debug, args, kwargs):
+            start = parser.executeIndex
+            retval = Error
+            try:
+                retval = parseAlternative(alternative, level, debug, args, kwargs)
+                return retval
+            finally:
+                self._countAlternative(parser, alternative, start, retval is not Error)
+
+        if parser._engine == "earley":
+            parser._parseEntry = tracedRule
+            return
+
+        parser._parseEntry = parser._parseRule = tracedRule
+        parser._parseAlternative = tracedAlternative
+
+    def _installStack(self, parser, root):
+        parseEntry = parser._parseEntry
+        tracer = self
+
+        class StackTrace:
+            def enterRule(self, name):
+                tracer._enter(root, name)
+
+            def leaveRule(self, name, matched):
+                tracer._leave(tracer.rules, name, matched)
+
+            def leaveAlternative(self, alternative, start, matched):
+                tracer._countAlternative(parser, alternative, start, matched)
+
+        def tracedEntry(funcName, first=0, level=0, debug=False, args=(), kwargs={}):
+            # frames of rules an exception left open are dropped
+            depth = len(self._frames)
+            try:
+                return parseEntry(funcName, first, level, debug, args, kwargs)
+            finally:
+                del self._frames[depth:]
+
+        parser._trace = StackTrace()
+        parser._parseEntry = tracedEntry
+
+    def _countAlternative(self, parser, alternative, start, matched):
+        counts = self.alternatives.get((alternative.name, alternative.pattern))
+        if counts is None:
+            counts = self.alternatives[(alternative.name, alternative.pattern)] = [0, 0]
+        counts[0] += 1
+
+        if matched:
+            counts[1] += 1
+        else:
+            self._stats(self.rules, alternative.name).backtracked += parser.executeIndex - start
+
+    def _installGenerator(self, generator):
+        root = type(generator).__name__
+
+        def traced(name, handler):
+            def tracedHandler(generator, node, *args, **kwargs):
+                self._enter(root, name)
+                succeeded = False
+                try:
+                    retval = handler(generator, node, *args, **kwargs)
+                    succeeded = True
+                    return retval
+                finally:
+                    self._leave(self.nodes, name, succeeded)
+            return tracedHandler
+
+        generator._handlers = {name: traced(name, handler) for name, handler in generator._handlers.items()}
+        generator._streamers = {name: traced(name, streamer) for name, streamer in generator._streamers.items()}
+
+    def _enter(self, root, name):
+        parent = self._frames[-1][0] if self._frames else root
+        self._frames.append([f"{parent};{name}", self.clock(), 0])
+
+    def _leave(self, table, name, succeeded):
+        path, start, children = self._frames.pop()
+        elapsed = self.clock() - start
+
+        stats = self._stats(table, name)
+        stats.calls += 1
+        if succeeded:
+            stats.successes += 1
+        else:
+            stats.failures += 1
+        stats.inclusive += elapsed
+        stats.exclusive += elapsed - children
+
+        self.stacks[path] = self.stacks.get(path, 0) + elapsed - children
+        if self._frames:
+            self._frames[-1][2] += elapsed
+
+    @staticmethod
+    def _stats(table, name):
+        stats = table.get(name)
+        if stats is None:
+            stats = table[name] = Stats()
+        return stats
+
+    def report(self, limit=None):
+        """
+        the rules and node types as text tables, slowest first
+        by exclusive time, times in milliseconds
+        """
+        lines = []
+        for title, table in (("rule", self.rules), ("node", self.nodes)):
+            if not table:
+                continue
+
+            width = max(len(title), *map(len, table))
+            lines.append(f"{title:{width}}  {'calls':>9}  {'matched':>9}  {'failed':>9}  {'backtracked':>11}  {'inclusive':>10}  {'exclusive':>10}")
+
+            ordered = sorted(table.items(), key=lambda item: item[1].exclusive, reverse=True)
+            for name, stats in ordered[:limit]:
+                lines.append(f"{name:{width}}  {stats.calls:9}  {stats.successes:9}  {stats.failures:9}  {stats.backtracked:11}  "
+                             f"{stats.inclusive / 1e6:10.3f}  {stats.exclusive / 1e6:10.3f}")
+            lines.append("")
+
+        return "\n".join(lines)
+
+    def flamegraph(self):
+        """
+        the stacks in the folded format of flamegraph.pl and speedscope,
+        one 'root;rule;rule microseconds' line per stack
+        """
+        return "\n".join(f"{path} {time // 1000}" for path, time in sorted(self.stacks.items()) if time >= 1000) + "\n"
+
+    def write_flamegraph(self, path):
+        with open(path, "w") as file:
+            file.write(self.flamegraph())
+
+    def profile(self):
+        """
+        how often each alternative of each rule matched, the profile
+        a parser class takes to try the likely alternatives first
+
+            {"version": 1, "rules": {rule: {pattern: matches}}}
+        """
+        rules = {}
+        for (name, pattern), (tries, matches) in sorted(self.alternatives.items()):
+            rules.setdefault(name, {})[pattern] = matches
+        return {"version": _PROFILE_VERSION, "rules": rules}
+
+    def write_profile(self, path):
+        with open(path, "w") as file:
+            json.dump(self.profile(), file, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    """
+    python tracing.py program.swft ... [--profile out.json] [--flamegraph out.folded]
+
+    parses and generates every file traced and prints the report,
+    the profile trains the alternative order of a parser class
+    """
+    arguments = argparse.ArgumentParser(description="trace parsing and generating .swft files")
+    arguments.add_argument("paths", nargs="+")
+    arguments.add_argument("--profile", default=None, help="file to write how often each alternative matched to")
+    arguments.add_argument("--flamegraph", default=None, help="file to write the folded stacks to")
+    arguments.add_argument("--limit", type=int, default=20, help="rows of the report per table")
+    arguments = arguments.parse_args(argv)
+
+    # the stack engine nests no python calls however deep the program is
+    tracer = Tracer()
+    for path in arguments.paths:
+        with open(path) as file:
+            tree = tracer.install(_StackParser(Tokenizer(file.read()).tokenize_store())).parse()
+        tracer.install(Generator(tree)).generate()
+
+    print(tracer.report(arguments.limit))
+
+    if arguments.profile is not None:
+        tracer.write_profile(arguments.profile)
+    if arguments.flamegraph is not None:
+        tracer.write_flamegraph(arguments.flamegraph)
+
+
+if __name__ == "__main__":
+    main()